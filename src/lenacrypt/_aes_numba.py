@@ -0,0 +1,142 @@
+import numpy as np
+from numba import njit
+
+
+__all__ = [
+    'decrypt_blocks',
+    'encrypt_blocks',
+    'round_keys',
+    'tables',
+]
+
+
+def tables(sbox: bytes, inv_sbox: bytes, te: tuple, td: tuple) -> tuple:
+    """
+    Convert the AES lookup tables to the arrays expected by the kernels.
+
+    :param sbox: The S-box.
+    :param inv_sbox: The inverse S-box.
+    :param te: The four encryption T-tables.
+    :param td: The four decryption T-tables.
+    :return: The tables as numpy arrays.
+    """
+    return (
+        np.frombuffer(sbox, dtype=np.uint8),
+        np.frombuffer(inv_sbox, dtype=np.uint8),
+        np.array(te, dtype=np.uint32),
+        np.array(td, dtype=np.uint32),
+    )
+
+
+def round_keys(words: list[int]) -> np.ndarray:
+    """
+    Convert a key schedule of 32-bit words to the array expected by the kernels.
+
+    :param words: The round keys as 32-bit big-endian words.
+    :return: The round keys as a numpy array.
+    """
+    return np.array(words, dtype=np.uint32)
+
+
+@njit(cache=True, boundscheck=False)
+def _load(data, offset):
+    return (
+        (np.uint32(data[offset]) << 24) | (np.uint32(data[offset + 1]) << 16)
+        | (np.uint32(data[offset + 2]) << 8) | np.uint32(data[offset + 3])
+    )
+
+
+@njit(cache=True, boundscheck=False)
+def _store(data, offset, word):
+    data[offset] = np.uint8(word >> 24)
+    data[offset + 1] = np.uint8((word >> 16) & 0xff)
+    data[offset + 2] = np.uint8((word >> 8) & 0xff)
+    data[offset + 3] = np.uint8(word & 0xff)
+
+
+@njit(cache=True, boundscheck=False)
+def _encrypt_blocks(data, out, rk, sbox, te):
+    last = rk.shape[0] - 4
+    for offset in range(0, data.shape[0], 16):
+        s0 = _load(data, offset) ^ rk[0]
+        s1 = _load(data, offset + 4) ^ rk[1]
+        s2 = _load(data, offset + 8) ^ rk[2]
+        s3 = _load(data, offset + 12) ^ rk[3]
+        for k in range(4, last, 4):
+            t0 = te[0, s0 >> 24] ^ te[1, (s1 >> 16) & 0xff] ^ te[2, (s2 >> 8) & 0xff] ^ te[3, s3 & 0xff] ^ rk[k]
+            t1 = te[0, s1 >> 24] ^ te[1, (s2 >> 16) & 0xff] ^ te[2, (s3 >> 8) & 0xff] ^ te[3, s0 & 0xff] ^ rk[k + 1]
+            t2 = te[0, s2 >> 24] ^ te[1, (s3 >> 16) & 0xff] ^ te[2, (s0 >> 8) & 0xff] ^ te[3, s1 & 0xff] ^ rk[k + 2]
+            t3 = te[0, s3 >> 24] ^ te[1, (s0 >> 16) & 0xff] ^ te[2, (s1 >> 8) & 0xff] ^ te[3, s2 & 0xff] ^ rk[k + 3]
+            s0, s1, s2, s3 = t0, t1, t2, t3
+        for i in range(4):
+            if i == 0:
+                a, b, c, d = s0, s1, s2, s3
+            elif i == 1:
+                a, b, c, d = s1, s2, s3, s0
+            elif i == 2:
+                a, b, c, d = s2, s3, s0, s1
+            else:
+                a, b, c, d = s3, s0, s1, s2
+            word = (
+                (np.uint32(sbox[a >> 24]) << 24) | (np.uint32(sbox[(b >> 16) & 0xff]) << 16)
+                | (np.uint32(sbox[(c >> 8) & 0xff]) << 8) | np.uint32(sbox[d & 0xff])
+            )
+            _store(out, offset + 4 * i, word ^ rk[last + i])
+
+
+@njit(cache=True, boundscheck=False)
+def _decrypt_blocks(data, out, rk, inv_sbox, td):
+    last = rk.shape[0] - 4
+    for offset in range(0, data.shape[0], 16):
+        s0 = _load(data, offset) ^ rk[0]
+        s1 = _load(data, offset + 4) ^ rk[1]
+        s2 = _load(data, offset + 8) ^ rk[2]
+        s3 = _load(data, offset + 12) ^ rk[3]
+        for k in range(4, last, 4):
+            t0 = td[0, s0 >> 24] ^ td[1, (s3 >> 16) & 0xff] ^ td[2, (s2 >> 8) & 0xff] ^ td[3, s1 & 0xff] ^ rk[k]
+            t1 = td[0, s1 >> 24] ^ td[1, (s0 >> 16) & 0xff] ^ td[2, (s3 >> 8) & 0xff] ^ td[3, s2 & 0xff] ^ rk[k + 1]
+            t2 = td[0, s2 >> 24] ^ td[1, (s1 >> 16) & 0xff] ^ td[2, (s0 >> 8) & 0xff] ^ td[3, s3 & 0xff] ^ rk[k + 2]
+            t3 = td[0, s3 >> 24] ^ td[1, (s2 >> 16) & 0xff] ^ td[2, (s1 >> 8) & 0xff] ^ td[3, s0 & 0xff] ^ rk[k + 3]
+            s0, s1, s2, s3 = t0, t1, t2, t3
+        for i in range(4):
+            if i == 0:
+                a, b, c, d = s0, s3, s2, s1
+            elif i == 1:
+                a, b, c, d = s1, s0, s3, s2
+            elif i == 2:
+                a, b, c, d = s2, s1, s0, s3
+            else:
+                a, b, c, d = s3, s2, s1, s0
+            word = (
+                (np.uint32(inv_sbox[a >> 24]) << 24) | (np.uint32(inv_sbox[(b >> 16) & 0xff]) << 16)
+                | (np.uint32(inv_sbox[(c >> 8) & 0xff]) << 8) | np.uint32(inv_sbox[d & 0xff])
+            )
+            _store(out, offset + 4 * i, word ^ rk[last + i])
+
+
+def encrypt_blocks(data: bytes, keys: np.ndarray, tables_: tuple) -> bytes:
+    """
+    Encrypt one or more 16-byte blocks using the T-table kernel. Not constant-time.
+
+    :param data: The plaintext. Its length must be a multiple of 16.
+    :param keys: The encryption round keys as returned by round_keys.
+    :param tables_: The lookup tables as returned by tables.
+    :return: The ciphertext.
+    """
+    out = np.empty(len(data), dtype=np.uint8)
+    _encrypt_blocks(np.frombuffer(data, dtype=np.uint8), out, keys, tables_[0], tables_[2])
+    return out.tobytes()
+
+
+def decrypt_blocks(data: bytes, keys: np.ndarray, tables_: tuple) -> bytes:
+    """
+    Decrypt one or more 16-byte blocks using the T-table kernel (equivalent inverse cipher). Not constant-time.
+
+    :param data: The ciphertext. Its length must be a multiple of 16.
+    :param keys: The decryption round keys as returned by round_keys.
+    :param tables_: The lookup tables as returned by tables.
+    :return: The plaintext.
+    """
+    out = np.empty(len(data), dtype=np.uint8)
+    _decrypt_blocks(np.frombuffer(data, dtype=np.uint8), out, keys, tables_[1], tables_[3])
+    return out.tobytes()
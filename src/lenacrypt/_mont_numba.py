@@ -0,0 +1,114 @@
+import numpy as np
+from numba import njit
+
+
+__all__ = [
+    'mont_mul',
+    'mont_powmod',
+]
+
+
+_MASK = np.uint64(0xffffffff)
+_SHIFT = np.uint64(32)
+_SIGN = np.uint64(63)
+_ONE = np.uint64(1)
+_ZERO = np.uint64(0)
+
+
+@njit(cache=True, boundscheck=False)
+def mont_mul(a, b, n, n0inv, out):
+    """
+    Montgomery multiplication out = a * b * R^-1 mod n (CIOS) over little-endian 32-bit limbs stored in uint64 arrays,
+    with R = 2^(32 * len(n)). a and b must be smaller than n, and out may alias neither of them.
+
+    :param a: The first factor.
+    :param b: The second factor.
+    :param n: The odd modulus.
+    :param n0inv: -n^-1 mod 2^32.
+    :param out: The array to store the product in.
+    """
+    s = n.shape[0]
+    t = np.zeros(s + 2, dtype=np.uint64)
+    for i in range(s):
+        ai = a[i]
+        c = _ZERO
+        for j in range(s):
+            x = t[j] + ai * b[j] + c
+            t[j] = x & _MASK
+            c = x >> _SHIFT
+        x = t[s] + c
+        t[s] = x & _MASK
+        t[s + 1] = x >> _SHIFT
+        m = (t[0] * n0inv) & _MASK
+        c = (t[0] + m * n[0]) >> _SHIFT
+        for j in range(1, s):
+            x = t[j] + m * n[j] + c
+            t[j - 1] = x & _MASK
+            c = x >> _SHIFT
+        x = t[s] + c
+        t[s - 1] = x & _MASK
+        t[s] = t[s + 1] + (x >> _SHIFT)
+    subtract = t[s] != 0
+    if not subtract:
+        subtract = True
+        for j in range(s - 1, -1, -1):
+            if t[j] != n[j]:
+                subtract = t[j] > n[j]
+                break
+    if subtract:
+        borrow = _ZERO
+        for j in range(s):
+            x = t[j] - n[j] - borrow
+            out[j] = x & _MASK
+            borrow = (x >> _SIGN) & _ONE
+    else:
+        for j in range(s):
+            out[j] = t[j]
+
+
+@njit(cache=True, boundscheck=False)
+def _mont_powmod(base, exp, n, n0inv, r2):
+    s = n.shape[0]
+    one = np.zeros(s, dtype=np.uint64)
+    one[0] = _ONE
+    table = np.empty((16, s), dtype=np.uint64)
+    mont_mul(one, r2, n, n0inv, table[0])
+    mont_mul(base, r2, n, n0inv, table[1])
+    for i in range(2, 16):
+        mont_mul(table[i - 1], table[1], n, n0inv, table[i])
+    result = table[0].copy()
+    tmp = np.empty(s, dtype=np.uint64)
+    for k in range(2 * exp.shape[0]):
+        byte = np.int64(exp[k >> 1])
+        window = byte >> 4 if k & 1 == 0 else byte & 15
+        for _ in range(4):
+            mont_mul(result, result, n, n0inv, tmp)
+            result[:] = tmp
+        if window:
+            mont_mul(result, table[window], n, n0inv, tmp)
+            result[:] = tmp
+    mont_mul(result, one, n, n0inv, tmp)
+    return tmp
+
+
+def _to_limbs(x: int, size: int) -> np.ndarray:
+    return np.frombuffer(x.to_bytes(4 * size, 'little'), dtype=np.uint32).astype(np.uint64)
+
+
+def mont_powmod(base: int, exp: int, n: int) -> int:
+    """
+    Modular exponentiation with Montgomery multiplication and a fixed 4-bit window. Not constant-time.
+
+    :param base: The base.
+    :param exp: The non-negative exponent.
+    :param n: The odd modulus, greater than 1.
+    :return: base^exp mod n
+    """
+    size = (n.bit_length() + 31) // 32
+    n0inv = -pow(n, -1, 1 << 32) % (1 << 32)
+    r2 = (1 << (64 * size)) % n
+    exp_bytes = np.frombuffer(exp.to_bytes((exp.bit_length() + 7) // 8, 'big'), dtype=np.uint8)
+    result = _mont_powmod(
+        _to_limbs(base % n, size), exp_bytes, _to_limbs(n, size), np.uint64(n0inv), _to_limbs(r2, size)
+    )
+    return int.from_bytes(result.astype(np.uint32).tobytes(), 'little')
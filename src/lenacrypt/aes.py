@@ -1,19 +1,39 @@
+import operator
+
 try:
     from .rand import randint, randbytes
 except ImportError:
     from rand import randint, randbytes
 
+try:
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+except ImportError:
+    Cipher = algorithms = modes = None
+
+# The pure-Python fallback only loads its Numba kernels if the cryptography backend is missing.
+_aes_numba = None
+if Cipher is None:
+    try:
+        try:
+            from . import _aes_numba
+        except ImportError:
+            import _aes_numba
+    except ImportError:
+        _aes_numba = None
+
 
 __all__ = [
     'AES',
     'AesExt',
     'INV_SBOX',
+    'INV_SHIFT_ROWS',
     'RCON',
     'SBOX',
+    'SHIFT_ROWS',
 ]
 
 
-SBOX = [
+SBOX = bytes([
     99, 124, 119, 123, 242, 107, 111, 197, 48, 1, 103, 43, 254, 215, 171, 118, 202, 130, 201, 125, 250, 89, 71, 240,
     173, 212, 162, 175, 156, 164, 114, 192, 183, 253, 147, 38, 54, 63, 247, 204, 52, 165, 229, 241, 113, 216, 49, 21, 4,
     199, 35, 195, 24, 150, 5, 154, 7, 18, 128, 226, 235, 39, 178, 117, 9, 131, 44, 26, 27, 110, 90, 160, 82, 59, 214,
@@ -25,24 +45,24 @@ SBOX = [
     116, 31, 75, 189, 139, 138, 112, 62, 181, 102, 72, 3, 246, 14, 97, 53, 87, 185, 134, 193, 29, 158, 225, 248, 152,
     17, 105, 217, 142, 148, 155, 30, 135, 233, 206, 85, 40, 223, 140, 161, 137, 13, 191, 230, 66, 104, 65, 153, 45, 15,
     176, 84, 187, 22,
-]
+])
 
-INV_SBOX = [SBOX.index(i) for i in range(256)]
+_inv_sbox = bytearray(256)
+for _i, _s in enumerate(SBOX):
+    _inv_sbox[_s] = _i
+INV_SBOX = bytes(_inv_sbox)
+del _inv_sbox, _i, _s
 
-RCON = [
+# Source index of every state byte after ShiftRows / InvShiftRows, for the column-major state layout.
+SHIFT_ROWS = bytes([0, 5, 10, 15, 4, 9, 14, 3, 8, 13, 2, 7, 12, 1, 6, 11])
+INV_SHIFT_ROWS = bytes([0, 13, 10, 7, 4, 1, 14, 11, 8, 5, 2, 15, 12, 9, 6, 3])
+_shift_rows = operator.itemgetter(*SHIFT_ROWS)
+_inv_shift_rows = operator.itemgetter(*INV_SHIFT_ROWS)
+
+RCON = bytes([
     0, 1, 2, 4, 8, 16, 32, 64, 128, 27, 54, 108, 216, 171, 77, 154, 47, 94, 188, 99, 198, 151, 53, 106, 212, 179, 125,
     250, 239, 197, 145, 57,
-]
-
-
-def rotate(word: list[int]) -> list[int]:
-    """
-    Rotate a 4-byte word to the left by 1 byte.
-
-    :param word: The 4-byte word to rotate.
-    :return: The rotated word.
-    """
-    return word[1:] + word[:1]
+])
 
 
 def gmul(a: int, b: int) -> int:
@@ -65,18 +85,30 @@ def gmul(a: int, b: int) -> int:
     return p & 0xff
 
 
-def schedule_core(word: list[int], i: int) -> bytes:
-    """
-    Perform the core key expansion operation.
-
-    :param word: The 4-byte word to expand.
-    :param i: The round number.
-    :return: The expanded word.
-    """
-    word = rotate(word)
-    word = bytes([SBOX[b] for b in word])
-    word = bytes([word[0] ^ RCON[i]]) + word[1:]
-    return word
+# Multiplication tables derived from xtime (multiplication by 2) so that no gmul loop runs at import time.
+_MUL2 = bytes([((i << 1) ^ (0x1b if i & 0x80 else 0)) & 0xff for i in range(256)])
+_MUL4 = bytes([_MUL2[_MUL2[i]] for i in range(256)])
+_MUL8 = bytes([_MUL2[_MUL4[i]] for i in range(256)])
+_MUL3 = bytes([_MUL2[i] ^ i for i in range(256)])
+_MUL9 = bytes([_MUL8[i] ^ i for i in range(256)])
+_MUL11 = bytes([_MUL8[i] ^ _MUL2[i] ^ i for i in range(256)])
+_MUL13 = bytes([_MUL8[i] ^ _MUL4[i] ^ i for i in range(256)])
+_MUL14 = bytes([_MUL8[i] ^ _MUL4[i] ^ _MUL2[i] for i in range(256)])
+
+# T-tables fusing SubBytes, ShiftRows and MixColumns (resp. their inverses) into four lookups per column.
+# Lookups are indexed by secret data, so the T-table path is not constant-time.
+_TE0 = tuple((_MUL2[s] << 24) | (s << 16) | (s << 8) | _MUL3[s] for s in SBOX)
+_TE1 = tuple(((w >> 8) | (w << 24)) & 0xffffffff for w in _TE0)
+_TE2 = tuple(((w >> 8) | (w << 24)) & 0xffffffff for w in _TE1)
+_TE3 = tuple(((w >> 8) | (w << 24)) & 0xffffffff for w in _TE2)
+_TD0 = tuple((_MUL14[s] << 24) | (_MUL9[s] << 16) | (_MUL13[s] << 8) | _MUL11[s] for s in INV_SBOX)
+_TD1 = tuple(((w >> 8) | (w << 24)) & 0xffffffff for w in _TD0)
+_TD2 = tuple(((w >> 8) | (w << 24)) & 0xffffffff for w in _TD1)
+_TD3 = tuple(((w >> 8) | (w << 24)) & 0xffffffff for w in _TD2)
+
+_NUMBA_TABLES = None
+if _aes_numba is not None:
+    _NUMBA_TABLES = _aes_numba.tables(SBOX, INV_SBOX, (_TE0, _TE1, _TE2, _TE3), (_TD0, _TD1, _TD2, _TD3))
 
 
 def expand_key(key: bytes) -> bytes:
@@ -90,119 +122,291 @@ def expand_key(key: bytes) -> bytes:
     key_byte_length = len(key)
     if key_byte_length not in valid_key_sizes:
         raise ValueError(f"Invalid key size {key_byte_length}, must be one of {valid_key_sizes}")
-    num_rounds = {16: 10, 24: 12, 32: 14}[key_byte_length]
-    expanded_key = list(key)
+    length = {16: 176, 24: 208, 32: 240}[key_byte_length]
+    expanded_key = bytearray(length)
+    expanded_key[:key_byte_length] = key
     i = 1
-    while len(expanded_key) < (num_rounds + 1) * key_byte_length:
-        t = expanded_key[-4:]
-        if len(expanded_key) % key_byte_length == 0:
-            t = schedule_core(t, i)
+    for n in range(key_byte_length, length, 4):
+        t0, t1, t2, t3 = expanded_key[n - 4:n]
+        if n % key_byte_length == 0:
+            t0, t1, t2, t3 = SBOX[t1] ^ RCON[i], SBOX[t2], SBOX[t3], SBOX[t0]
             i += 1
-        if key_byte_length == 32 and len(expanded_key) % key_byte_length == 16:
-            t = bytes([SBOX[b] for b in t])
-        for a in range(4):
-            expanded_key.append(expanded_key[-key_byte_length] ^ t[a])
-    lengths = {16: 176, 24: 208, 32: 240}
-    return bytes(expanded_key)[:lengths[key_byte_length]]
+        elif key_byte_length == 32 and n % key_byte_length == 16:
+            t0, t1, t2, t3 = SBOX[t0], SBOX[t1], SBOX[t2], SBOX[t3]
+        m = n - key_byte_length
+        expanded_key[n] = expanded_key[m] ^ t0
+        expanded_key[n + 1] = expanded_key[m + 1] ^ t1
+        expanded_key[n + 2] = expanded_key[m + 2] ^ t2
+        expanded_key[n + 3] = expanded_key[m + 3] ^ t3
+    return bytes(expanded_key)
 
 
-def add_round_key(state: list[list[int]], round_key: list[list[int]]) -> None:
+def add_round_key(state: bytearray, round_key: bytes) -> None:
     """
     XOR the state with the round key. Modifies the state in-place.
 
-    :param state: The state matrix.
-    :param round_key: The round key.
+    :param state: The 16-byte state in column-major order.
+    :param round_key: The 16-byte round key.
     """
-    for i in range(4):
-        for j in range(4):
-            state[i][j] ^= round_key[i][j]
+    for i in range(16):
+        state[i] ^= round_key[i]
 
 
-def sub_bytes(state: list[list[int]]) -> None:
+def sub_bytes(state: bytearray) -> None:
     """
     Apply the S-box to each byte of the state. Modifies the state in-place.
 
-    :param state: The state matrix.
+    :param state: The 16-byte state in column-major order.
     """
-    for i in range(4):
-        for j in range(4):
-            state[i][j] = SBOX[state[i][j]]
+    for i in range(16):
+        state[i] = SBOX[state[i]]
 
 
-def shift_rows(state: list[list[int]]) -> None:
+def shift_rows(state: bytearray) -> None:
     """
     Shift the rows of the state matrix. Modifies the state in-place.
 
-    :param state: The state matrix.
+    :param state: The 16-byte state in column-major order.
     """
-    state[1] = [state[1][-1]] + state[1][:-1]
-    state[2] = state[2][-2:] + state[2][:-2]
-    state[3] = state[3][-3:] + state[3][:-3]
+    state[:] = _shift_rows(state)
 
 
-def mix_columns(state: list[list[int]]) -> None:
+def mix_columns(state: bytearray) -> None:
     """
     Mix the columns of the state matrix. Modifies the state in-place.
 
-    :param state: The state matrix.
+    :param state: The 16-byte state in column-major order.
     """
-    for i in range(4):
-        s0 = state[0][i]
-        s1 = state[1][i]
-        s2 = state[2][i]
-        s3 = state[3][i]
+    for i in range(0, 16, 4):
+        s0 = state[i]
+        s1 = state[i + 1]
+        s2 = state[i + 2]
+        s3 = state[i + 3]
 
-        state[0][i] = gmul(s0, 2) ^ gmul(s1, 3) ^ s2 ^ s3
-        state[1][i] = s0 ^ gmul(s1, 2) ^ gmul(s2, 3) ^ s3
-        state[2][i] = s0 ^ s1 ^ gmul(s2, 2) ^ gmul(s3, 3)
-        state[3][i] = gmul(s0, 3) ^ s1 ^ s2 ^ gmul(s3, 2)
+        state[i] = _MUL2[s0] ^ _MUL3[s1] ^ s2 ^ s3
+        state[i + 1] = s0 ^ _MUL2[s1] ^ _MUL3[s2] ^ s3
+        state[i + 2] = s0 ^ s1 ^ _MUL2[s2] ^ _MUL3[s3]
+        state[i + 3] = _MUL3[s0] ^ s1 ^ s2 ^ _MUL2[s3]
 
 
-def inv_mix_columns(state: list[list[int]]) -> None:
+def inv_mix_columns(state: bytearray) -> None:
     """
     Inverse of mix_columns. Modifies the state in-place.
 
-    :param state: The state matrix.
+    :param state: The 16-byte state in column-major order.
     """
-    for i in range(4):
-        s0 = state[0][i]
-        s1 = state[1][i]
-        s2 = state[2][i]
-        s3 = state[3][i]
+    for i in range(0, 16, 4):
+        s0 = state[i]
+        s1 = state[i + 1]
+        s2 = state[i + 2]
+        s3 = state[i + 3]
 
-        state[0][i] = gmul(s0, 0x0e) ^ gmul(s1, 0x0b) ^ gmul(s2, 0x0d) ^ gmul(s3, 0x09)
-        state[1][i] = gmul(s0, 0x09) ^ gmul(s1, 0x0e) ^ gmul(s2, 0x0b) ^ gmul(s3, 0x0d)
-        state[2][i] = gmul(s0, 0x0d) ^ gmul(s1, 0x09) ^ gmul(s2, 0x0e) ^ gmul(s3, 0x0b)
-        state[3][i] = gmul(s0, 0x0b) ^ gmul(s1, 0x0d) ^ gmul(s2, 0x09) ^ gmul(s3, 0x0e)
+        state[i] = _MUL14[s0] ^ _MUL11[s1] ^ _MUL13[s2] ^ _MUL9[s3]
+        state[i + 1] = _MUL9[s0] ^ _MUL14[s1] ^ _MUL11[s2] ^ _MUL13[s3]
+        state[i + 2] = _MUL13[s0] ^ _MUL9[s1] ^ _MUL14[s2] ^ _MUL11[s3]
+        state[i + 3] = _MUL11[s0] ^ _MUL13[s1] ^ _MUL9[s2] ^ _MUL14[s3]
 
 
-def inv_sub_bytes(state: list[list[int]]) -> None:
+def inv_sub_bytes(state: bytearray) -> None:
     """
     Inverse of sub_bytes. Modifies the state in-place.
 
-    :param state: The state matrix.
+    :param state: The 16-byte state in column-major order.
     """
-    for i in range(4):
-        for j in range(4):
-            state[i][j] = INV_SBOX[state[i][j]]
+    for i in range(16):
+        state[i] = INV_SBOX[state[i]]
 
 
-def inv_shift_rows(state: list[list[int]]) -> None:
+def inv_shift_rows(state: bytearray) -> None:
     """
     Inverse of shift_rows. Modifies the state in-place.
 
-    :param state: The state matrix.
+    :param state: The 16-byte state in column-major order.
+    """
+    state[:] = _inv_shift_rows(state)
+
+
+def _ct_lookup(table: bytes, x: int) -> int:
+    """
+    Look up table[x] in a 256-byte table, reading one byte from each of its four 64-byte cache lines and selecting the
+    result with masks instead of branches, so the accessed cache lines do not depend on x.
+
+    :param table: The 256-byte table.
+    :param x: The index.
+    :return: The table entry.
+    """
+    low = x & 0x3f
+    high = x >> 6
+    return (
+        (table[low] & ((high - 1) >> 8))
+        | (table[low + 64] & (((high ^ 1) - 1) >> 8))
+        | (table[low + 128] & (((high ^ 2) - 1) >> 8))
+        | (table[low + 192] & (((high ^ 3) - 1) >> 8))
+    )
+
+
+def _xtime(a: int) -> int:
+    """
+    Multiply an element of GF(2^8) by 2 without branches or table lookups.
+
+    :param a: The element.
+    :return: The product.
+    """
+    return ((a << 1) ^ (0x1b & -(a >> 7))) & 0xff
+
+
+def ct_sub_bytes(state: bytearray) -> None:
+    """
+    Cache-timing hardened variant of sub_bytes. Modifies the state in-place.
+
+    :param state: The 16-byte state in column-major order.
+    """
+    for i in range(16):
+        state[i] = _ct_lookup(SBOX, state[i])
+
+
+def ct_inv_sub_bytes(state: bytearray) -> None:
+    """
+    Cache-timing hardened variant of inv_sub_bytes. Modifies the state in-place.
+
+    :param state: The 16-byte state in column-major order.
+    """
+    for i in range(16):
+        state[i] = _ct_lookup(INV_SBOX, state[i])
+
+
+def ct_mix_columns(state: bytearray) -> None:
+    """
+    Variant of mix_columns without table lookups. Modifies the state in-place.
+
+    :param state: The 16-byte state in column-major order.
+    """
+    for i in range(0, 16, 4):
+        s0 = state[i]
+        s1 = state[i + 1]
+        s2 = state[i + 2]
+        s3 = state[i + 3]
+        t = s0 ^ s1 ^ s2 ^ s3
+
+        state[i] = s0 ^ t ^ _xtime(s0 ^ s1)
+        state[i + 1] = s1 ^ t ^ _xtime(s1 ^ s2)
+        state[i + 2] = s2 ^ t ^ _xtime(s2 ^ s3)
+        state[i + 3] = s3 ^ t ^ _xtime(s3 ^ s0)
+
+
+def ct_inv_mix_columns(state: bytearray) -> None:
+    """
+    Variant of inv_mix_columns without table lookups. Modifies the state in-place.
+
+    :param state: The 16-byte state in column-major order.
+    """
+    for i in range(0, 16, 4):
+        u = _xtime(_xtime(state[i] ^ state[i + 2]))
+        v = _xtime(_xtime(state[i + 1] ^ state[i + 3]))
+        state[i] ^= u
+        state[i + 1] ^= v
+        state[i + 2] ^= u
+        state[i + 3] ^= v
+    ct_mix_columns(state)
+
+
+def ttable_encrypt(block: bytes, round_keys: list[int]) -> bytes:
+    """
+    Encrypt a single block using the T-table construction. Not constant-time.
+
+    :param block: The 16-byte block to encrypt.
+    :param round_keys: The expanded key as a list of 32-bit big-endian words.
+    :return: The encrypted block.
+    """
+    s0 = int.from_bytes(block[0:4], 'big') ^ round_keys[0]
+    s1 = int.from_bytes(block[4:8], 'big') ^ round_keys[1]
+    s2 = int.from_bytes(block[8:12], 'big') ^ round_keys[2]
+    s3 = int.from_bytes(block[12:16], 'big') ^ round_keys[3]
+    for k in range(4, len(round_keys) - 4, 4):
+        t0 = _TE0[s0 >> 24] ^ _TE1[(s1 >> 16) & 0xff] ^ _TE2[(s2 >> 8) & 0xff] ^ _TE3[s3 & 0xff] ^ round_keys[k]
+        t1 = _TE0[s1 >> 24] ^ _TE1[(s2 >> 16) & 0xff] ^ _TE2[(s3 >> 8) & 0xff] ^ _TE3[s0 & 0xff] ^ round_keys[k + 1]
+        t2 = _TE0[s2 >> 24] ^ _TE1[(s3 >> 16) & 0xff] ^ _TE2[(s0 >> 8) & 0xff] ^ _TE3[s1 & 0xff] ^ round_keys[k + 2]
+        t3 = _TE0[s3 >> 24] ^ _TE1[(s0 >> 16) & 0xff] ^ _TE2[(s1 >> 8) & 0xff] ^ _TE3[s2 & 0xff] ^ round_keys[k + 3]
+        s0, s1, s2, s3 = t0, t1, t2, t3
+    return b''.join([
+        (((SBOX[a >> 24] << 24) | (SBOX[(b >> 16) & 0xff] << 16) | (SBOX[(c >> 8) & 0xff] << 8) | SBOX[d & 0xff])
+         ^ round_keys[-4 + i]).to_bytes(4, 'big')
+        for i, (a, b, c, d) in enumerate(((s0, s1, s2, s3), (s1, s2, s3, s0), (s2, s3, s0, s1), (s3, s0, s1, s2)))
+    ])
+
+
+def ttable_decrypt(block: bytes, round_keys: list[int]) -> bytes:
+    """
+    Decrypt a single block using the T-table construction (equivalent inverse cipher). Not constant-time.
+
+    :param block: The 16-byte block to decrypt.
+    :param round_keys: The decryption key schedule as returned by ttable_decryption_keys.
+    :return: The decrypted block.
+    """
+    s0 = int.from_bytes(block[0:4], 'big') ^ round_keys[0]
+    s1 = int.from_bytes(block[4:8], 'big') ^ round_keys[1]
+    s2 = int.from_bytes(block[8:12], 'big') ^ round_keys[2]
+    s3 = int.from_bytes(block[12:16], 'big') ^ round_keys[3]
+    for k in range(4, len(round_keys) - 4, 4):
+        t0 = _TD0[s0 >> 24] ^ _TD1[(s3 >> 16) & 0xff] ^ _TD2[(s2 >> 8) & 0xff] ^ _TD3[s1 & 0xff] ^ round_keys[k]
+        t1 = _TD0[s1 >> 24] ^ _TD1[(s0 >> 16) & 0xff] ^ _TD2[(s3 >> 8) & 0xff] ^ _TD3[s2 & 0xff] ^ round_keys[k + 1]
+        t2 = _TD0[s2 >> 24] ^ _TD1[(s1 >> 16) & 0xff] ^ _TD2[(s0 >> 8) & 0xff] ^ _TD3[s3 & 0xff] ^ round_keys[k + 2]
+        t3 = _TD0[s3 >> 24] ^ _TD1[(s2 >> 16) & 0xff] ^ _TD2[(s1 >> 8) & 0xff] ^ _TD3[s0 & 0xff] ^ round_keys[k + 3]
+        s0, s1, s2, s3 = t0, t1, t2, t3
+    return b''.join([
+        (((INV_SBOX[a >> 24] << 24) | (INV_SBOX[(b >> 16) & 0xff] << 16) | (INV_SBOX[(c >> 8) & 0xff] << 8)
+          | INV_SBOX[d & 0xff]) ^ round_keys[-4 + i]).to_bytes(4, 'big')
+        for i, (a, b, c, d) in enumerate(((s0, s3, s2, s1), (s1, s0, s3, s2), (s2, s1, s0, s3), (s3, s2, s1, s0)))
+    ])
+
+
+def ttable_encryption_keys(key_schedule: bytes) -> list[int]:
+    """
+    Convert an expanded key to the list of 32-bit words used by ttable_encrypt.
+
+    :param key_schedule: The expanded key.
+    :return: The round keys as 32-bit big-endian words.
     """
-    state[1] = state[1][1:] + state[1][:1]
-    state[2] = state[2][2:] + state[2][:2]
-    state[3] = state[3][3:] + state[3][:3]
+    return [int.from_bytes(key_schedule[i:i + 4], 'big') for i in range(0, len(key_schedule), 4)]
+
+
+def ttable_decryption_keys(key_schedule: bytes) -> list[int]:
+    """
+    Derive the key schedule of the equivalent inverse cipher used by ttable_decrypt: the round keys in reverse order,
+    with InvMixColumns applied to all but the first and last.
+
+    :param key_schedule: The expanded key.
+    :return: The decryption round keys as 32-bit big-endian words.
+    """
+    words = ttable_encryption_keys(key_schedule)
+    round_keys = [words[i:i + 4] for i in range(0, len(words), 4)][::-1]
+    for round_key in round_keys[1:-1]:
+        for i, w in enumerate(round_key):
+            round_key[i] = (_TD0[SBOX[w >> 24]] ^ _TD1[SBOX[(w >> 16) & 0xff]] ^ _TD2[SBOX[(w >> 8) & 0xff]]
+                            ^ _TD3[SBOX[w & 0xff]])
+    return [w for round_key in round_keys for w in round_key]
 
 
 class AES:
+    """
+    AES block cipher. Uses the hardware-accelerated `cryptography` backend if it is installed and falls back to a
+    pure-Python implementation otherwise. With use_ttables=True the fallback uses the faster T-table construction,
+    which is not constant-time, compiled with numba if that is installed. With constant_time=True the fallback avoids
+    T-tables and data-dependent cache line accesses instead; this mitigates cache-timing attacks, but the Python
+    interpreter itself gives no constant-time guarantees.
+    """
 
-    def __init__(self, key: bytes = None):
+    def __init__(self, key: bytes = None, use_ttables: bool = True, constant_time: bool = False):
         self._key = b''
         self._key_schedule = b''
+        self._round_keys = ()
+        self._constant_time = constant_time
+        self._use_ttables = use_ttables and not constant_time
+        self._ttable_encryption_keys = []
+        self._ttable_decryption_keys = []
+        self._numba_encryption_keys = None
+        self._numba_decryption_keys = None
+        self._cipher = None
         self._set_key(key)
 
     @classmethod
@@ -221,19 +425,9 @@ class AES:
         """
         if len(plaintext) != 16:
             raise ValueError('Plaintext must be 16 bytes long.')
-        state = [list(plaintext[i:i + 4]) for i in range(0, 16, 4)]
-        round_keys = [self._key_schedule[i:i + 16] for i in range(0, len(self._key_schedule), 16)]
-        round_keys = [[list(round_keys[i][j:j + 4]) for j in range(0, 16, 4)] for i in range(len(round_keys))]
-        add_round_key(state, round_keys[0])
-        for round_ in range(1, len(round_keys) - 1):
-            sub_bytes(state)
-            shift_rows(state)
-            mix_columns(state)
-            add_round_key(state, round_keys[round_])
-        sub_bytes(state)
-        shift_rows(state)
-        add_round_key(state, round_keys[-1])
-        return bytes([state[i][j] for i in range(4) for j in range(4)])
+        if self._cipher is not None:
+            return self._cipher.encryptor().update(plaintext)
+        return self._encrypt_block(plaintext)
 
     def decrypt(self, ciphertext: bytes) -> bytes:
         """
@@ -243,19 +437,85 @@ class AES:
         """
         if len(ciphertext) != 16:
             raise ValueError('Ciphertext must be 16 bytes long.')
-        state = [list(ciphertext[i:i + 4]) for i in range(0, 16, 4)]
-        round_keys = [self._key_schedule[i:i + 16] for i in range(0, len(self._key_schedule), 16)]
-        round_keys = [[list(round_keys[i][j:j + 4]) for j in range(0, 16, 4)] for i in range(len(round_keys))]
+        if self._cipher is not None:
+            return self._cipher.decryptor().update(ciphertext)
+        return self._decrypt_block(ciphertext)
+
+    def encrypt_blocks(self, plaintext: bytes) -> bytes:
+        """
+        Encrypt multiple independent 16-byte blocks (ECB) in a single call.
+        :param plaintext: The plaintext to encrypt. Its length must be a multiple of 16.
+        :return: The encrypted ciphertext.
+        """
+        if len(plaintext) % 16 != 0:
+            raise ValueError('Plaintext length must be a multiple of 16.')
+        if self._cipher is not None:
+            return self._cipher.encryptor().update(plaintext)
+        if self._numba_encryption_keys is not None:
+            return _aes_numba.encrypt_blocks(plaintext, self._numba_encryption_keys, _NUMBA_TABLES)
+        return b''.join([self._encrypt_block(plaintext[i:i + 16]) for i in range(0, len(plaintext), 16)])
+
+    def decrypt_blocks(self, ciphertext: bytes) -> bytes:
+        """
+        Decrypt multiple independent 16-byte blocks (ECB) in a single call.
+        :param ciphertext: The ciphertext to decrypt. Its length must be a multiple of 16.
+        :return: The plaintext as bytes.
+        """
+        if len(ciphertext) % 16 != 0:
+            raise ValueError('Ciphertext length must be a multiple of 16.')
+        if self._cipher is not None:
+            return self._cipher.decryptor().update(ciphertext)
+        if self._numba_decryption_keys is not None:
+            return _aes_numba.decrypt_blocks(ciphertext, self._numba_decryption_keys, _NUMBA_TABLES)
+        return b''.join([self._decrypt_block(ciphertext[i:i + 16]) for i in range(0, len(ciphertext), 16)])
+
+    def _encrypt_block(self, plaintext: bytes) -> bytes:
+        if not self._round_keys:
+            self._expand_key()
+        if self._numba_encryption_keys is not None:
+            return _aes_numba.encrypt_blocks(plaintext, self._numba_encryption_keys, _NUMBA_TABLES)
+        if self._use_ttables:
+            return ttable_encrypt(plaintext, self._ttable_encryption_keys)
+        if self._constant_time:
+            sub_bytes_, mix_columns_ = ct_sub_bytes, ct_mix_columns
+        else:
+            sub_bytes_, mix_columns_ = sub_bytes, mix_columns
+        state = bytearray(plaintext)
+        round_keys = self._round_keys
+        add_round_key(state, round_keys[0])
+        for round_key in round_keys[1:-1]:
+            sub_bytes_(state)
+            shift_rows(state)
+            mix_columns_(state)
+            add_round_key(state, round_key)
+        sub_bytes_(state)
+        shift_rows(state)
+        add_round_key(state, round_keys[-1])
+        return bytes(state)
+
+    def _decrypt_block(self, ciphertext: bytes) -> bytes:
+        if not self._round_keys:
+            self._expand_key()
+        if self._numba_decryption_keys is not None:
+            return _aes_numba.decrypt_blocks(ciphertext, self._numba_decryption_keys, _NUMBA_TABLES)
+        if self._use_ttables:
+            return ttable_decrypt(ciphertext, self._ttable_decryption_keys)
+        if self._constant_time:
+            inv_sub_bytes_, inv_mix_columns_ = ct_inv_sub_bytes, ct_inv_mix_columns
+        else:
+            inv_sub_bytes_, inv_mix_columns_ = inv_sub_bytes, inv_mix_columns
+        state = bytearray(ciphertext)
+        round_keys = self._round_keys
         add_round_key(state, round_keys[-1])
         inv_shift_rows(state)
-        inv_sub_bytes(state)
-        for round_ in range(len(round_keys)-2, 0, -1):
-            add_round_key(state, round_keys[round_])
-            inv_mix_columns(state)
+        inv_sub_bytes_(state)
+        for round_key in round_keys[-2:0:-1]:
+            add_round_key(state, round_key)
+            inv_mix_columns_(state)
             inv_shift_rows(state)
-            inv_sub_bytes(state)
+            inv_sub_bytes_(state)
         add_round_key(state, round_keys[0])
-        return bytes([state[i][j] for i in range(4) for j in range(4)])
+        return bytes(state)
 
     def _set_key(self, value: bytes) -> None:
         if not isinstance(value, bytes):
@@ -263,7 +523,25 @@ class AES:
         if len(value) not in [16, 24, 32]:
             raise ValueError('Key must be 16, 24, or 32 bytes long.')
         self._key = value
-        self._key_schedule = expand_key(value)
+        self._key_schedule = b''
+        self._round_keys = ()
+        if Cipher is not None:
+            self._cipher = Cipher(algorithms.AES(value), modes.ECB())
+        else:
+            self._expand_key()
+
+    def _expand_key(self) -> None:
+        """
+        Compute the key schedules of the pure-Python fallback. Without the cryptography backend this happens whenever
+        the key is set, otherwise only on the first direct call of _encrypt_block or _decrypt_block.
+        """
+        self._key_schedule = expand_key(self._key)
+        self._round_keys = tuple(self._key_schedule[i:i + 16] for i in range(0, len(self._key_schedule), 16))
+        self._ttable_encryption_keys = ttable_encryption_keys(self._key_schedule)
+        self._ttable_decryption_keys = ttable_decryption_keys(self._key_schedule)
+        if self._use_ttables and _aes_numba is not None:
+            self._numba_encryption_keys = _aes_numba.round_keys(self._ttable_encryption_keys)
+            self._numba_decryption_keys = _aes_numba.round_keys(self._ttable_decryption_keys)
 
     @property
     def key(self) -> bytes:
@@ -294,7 +572,10 @@ class AES:
         return hash(self._key)
 
     def __copy__(self):
-        return AES(self._key)
+        return AES(self._key, self._use_ttables, self._constant_time)
+
+    def __reduce__(self):
+        return AES, (self._key, self._use_ttables, self._constant_time)
 
 
 class AesExt:
@@ -361,6 +642,18 @@ class AesExt:
         """
         return self.encrypt_block(ciphertext, index)
 
+    def _keystream(self, length: int) -> bytes:
+        """
+        Generate the counter-mode keystream, encrypting all counter blocks in a single call.
+        :param length: The number of keystream bytes to generate.
+        :return: The keystream as bytes.
+        """
+        start = int.from_bytes(self._counter, 'big')
+        counters = b''.join([
+            ((start + i) % 2 ** (16 * 8)).to_bytes(16, 'big') for i in range((length + 15) // 16)
+        ])
+        return self._aes.encrypt_blocks(counters)[:length]
+
     def encrypt(self, plaintext: bytes) -> bytes:
         """
         Encrypt the plaintext using AES with non-standard counter-mode.
@@ -368,7 +661,8 @@ class AesExt:
         :return: The ciphertext as bytes.
         """
         plaintext = self.pad(plaintext)
-        return b''.join([self.encrypt_block(plaintext[i:i + 16], i // 16) for i in range(0, len(plaintext), 16)])
+        key_stream = self._keystream(len(plaintext))
+        return (int.from_bytes(plaintext, 'big') ^ int.from_bytes(key_stream, 'big')).to_bytes(len(plaintext), 'big')
 
     def decrypt(self, ciphertext: bytes) -> bytes:
         """
@@ -376,7 +670,10 @@ class AesExt:
         :param ciphertext: The ciphertext to decrypt.
         :return: The plaintext as bytes.
         """
-        plaintext = b''.join([self.decrypt_block(ciphertext[i:i + 16], i // 16) for i in range(0, len(ciphertext), 16)])
+        key_stream = self._keystream(len(ciphertext))
+        plaintext = (
+            int.from_bytes(ciphertext, 'big') ^ int.from_bytes(key_stream, 'big')
+        ).to_bytes(len(ciphertext), 'big')
         return self.unpad(plaintext)
 
     def _set_key(self, value: bytes) -> None:
@@ -416,6 +713,9 @@ class AesExt:
     def __hash__(self):
         return hash(self._key)
 
+    def __reduce__(self):
+        return AesExt, (self.key,)
+
 
 if __name__ == '__main__':
     import unittest
@@ -433,6 +733,11 @@ if __name__ == '__main__':
             for i in test_vectors:
                 self.assertEqual(expand_key(i[:lengths[len(i)]]), i)
 
+        def test_aes_multiplication_tables(self):
+            for table, factor in ((_MUL2, 2), (_MUL3, 3), (_MUL9, 9), (_MUL11, 11), (_MUL13, 13), (_MUL14, 14)):
+                self.assertEqual(table, bytes([gmul(i, factor) for i in range(256)]))
+            self.assertEqual(bytes([INV_SBOX[SBOX[i]] for i in range(256)]), bytes(range(256)))
+
         def test_aes_encrypt_decrypt(self):
             for _ in range(4):
                 key = bytes([randint(0, 255) for _ in range(32)])
@@ -442,6 +747,36 @@ if __name__ == '__main__':
                 decrypted = aes.decrypt(encrypted)
                 self.assertEqual(message, decrypted)
 
+        def test_aes_known_answer(self):
+            # Test vector from FIPS-197, Appendix C.3
+            key = bytes(range(32))
+            plaintext = bytes.fromhex('00112233445566778899aabbccddeeff')
+            ciphertext = bytes.fromhex('8ea2b7ca516745bfeafc49904b496089')
+            aes = AES(key)
+            self.assertEqual(aes.encrypt(plaintext), ciphertext)
+            self.assertEqual(aes.decrypt(ciphertext), plaintext)
+            for use_ttables, constant_time in ((True, False), (False, False), (True, True)):
+                aes = AES(key, use_ttables=use_ttables, constant_time=constant_time)
+                self.assertEqual(aes._encrypt_block(plaintext), ciphertext)
+                self.assertEqual(aes._decrypt_block(ciphertext), plaintext)
+            key_schedule = expand_key(key)
+            self.assertEqual(ttable_encrypt(plaintext, ttable_encryption_keys(key_schedule)), ciphertext)
+            self.assertEqual(ttable_decrypt(ciphertext, ttable_decryption_keys(key_schedule)), plaintext)
+
+        def test_aes_encrypt_blocks(self):
+            aes = AES.random()
+            message = randbytes(16 * 9)
+            encrypted = aes.encrypt_blocks(message)
+            for i in range(0, len(message), 16):
+                self.assertEqual(encrypted[i:i + 16], aes._encrypt_block(message[i:i + 16]))
+            self.assertEqual(aes.decrypt_blocks(encrypted), message)
+
+        def test_aes_ext_keystream(self):
+            aes = AesExt.random()
+            message = randbytes(16 * 5)
+            expected = b''.join([aes.encrypt_block(message[i:i + 16], i // 16) for i in range(0, len(message), 16)])
+            self.assertEqual(aes.encrypt(message)[:len(message)], expected)
+
         def test_aes_ext_encrypt_decrypt(self):
             for _ in range(4):
                 aes = AesExt.random()
@@ -450,5 +785,17 @@ if __name__ == '__main__':
                 decrypted = aes.decrypt(encrypted)
                 self.assertEqual(message, decrypted)
 
+        def test_aes_pickle(self):
+            import copy
+            import pickle
+            for aes in (AES.random(), AES(bytes(16), constant_time=True), AesExt.random()):
+                message = randbytes(16)
+                for restored in (pickle.loads(pickle.dumps(aes)), copy.deepcopy(aes)):
+                    self.assertEqual(restored, aes)
+                    self.assertEqual(restored.key, aes.key)
+                    self.assertEqual(restored.encrypt(message), aes.encrypt(message))
+            aes = AES(bytes(16), use_ttables=False)
+            self.assertFalse(pickle.loads(pickle.dumps(aes))._use_ttables)
+
     unittest.main()
 
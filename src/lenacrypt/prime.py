@@ -1,42 +1,85 @@
+import functools
+import math
 import secrets
 
+try:
+    import gmpy2
+except ImportError:
+    gmpy2 = None
+
 
 __all__ = [
     'miller_rabin',
     'PRIMES',
+    'PRIMORIAL',
 ]
-PRIMES = [
-    2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43, 47, 53, 59, 61, 67, 71, 73, 79, 83, 89, 97,
-]
+
+
+def _sieve(limit: int) -> list[int]:
+    """
+    The sieve of Eratosthenes.
+    :param limit: The exclusive upper bound.
+    :return: All primes below the limit.
+    """
+    is_prime = bytearray([1]) * limit
+    is_prime[:2] = b'\x00\x00'
+    for i in range(2, math.isqrt(limit - 1) + 1):
+        if is_prime[i]:
+            is_prime[i * i::i] = bytes(len(range(i * i, limit, i)))
+    return [i for i in range(limit) if is_prime[i]]
+
+
+PRIMES = _sieve(2000)
+
+# The product of all PRIMES, used to reject candidates with a small factor in a single gcd.
+PRIMORIAL = math.prod(PRIMES)
+
+_MONT_MIN_BITS = 128
+
+
+@functools.cache
+def _mont_powmod_kernel():
+    """
+    Import the Numba Montgomery kernel on first use, so that numba is only loaded when gmpy2 is missing.
+    :return: The mont_powmod function, or None if numba is not installed.
+    """
+    try:
+        try:
+            from . import _mont_numba
+        except ImportError:
+            import _mont_numba
+    except ImportError:
+        return None
+    return _mont_numba.mont_powmod
 
 
 def miller_rabin(p: int, rounds: int = 32) -> bool:
     """
-    The Miller-Rabin primality test.
+    The Miller-Rabin primality test. Delegates to GMP if gmpy2 is installed, otherwise the modular exponentiation of
+    large numbers uses the Numba Montgomery kernel if numba is installed.
     :param p: The number to test for primality.
     :param rounds: The number of Miller-Rabin rounds to perform.
-    :return:
+    :return: False if p is composite, True if p is probably prime.
     """
     if p < 2:
         return False
-    for n in PRIMES:
-        if p == n:
-            return True
-        if p % n == 0:
-            return False
-    p_1 = p - 1
-    s = 0
-    while p_1 & 1 == 0:
-        s += 1
-        p_1 //= 2
-    d = p_1
+    if p <= PRIMES[-1]:
+        return p in PRIMES
+    if math.gcd(p, PRIMORIAL) != 1:
+        return False
+    if gmpy2 is not None:
+        return bool(gmpy2.is_prime(p, rounds))
+    p_minus_1 = p - 1
+    s = (p_minus_1 & -p_minus_1).bit_length() - 1
+    d = p_minus_1 >> s
+    powmod = (_mont_powmod_kernel() if p.bit_length() >= _MONT_MIN_BITS else None) or pow
     for _ in range(rounds):
-        x = pow(secrets.randbelow(p - 1) + 1, d, p)
-        if x == 1 or x == p - 1:
+        x = powmod(secrets.randbelow(p - 3) + 2, d, p)
+        if x == 1 or x == p_minus_1:
             continue
         for _ in range(s - 1):
-            x = pow(x, 2, p)
-            if x == p - 1:
+            x = x * x % p
+            if x == p_minus_1:
                 break
         else:
             return False
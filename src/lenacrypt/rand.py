@@ -1,36 +1,199 @@
+import bisect
+import hashlib
+import math
+import multiprocessing
+import os
 import secrets
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 
 try:
     from .prime import miller_rabin
 except ImportError:
     from prime import miller_rabin
 
+try:
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+except ImportError:
+    Cipher = algorithms = modes = None
+
 
 __all__ = [
     'randint',
     'random_prime',
+    'random_prime_parallel',
+    'random_primes_parallel',
     'randbytes',
 ]
 
 
+# Residues modulo 2 * 3 * 5 * 7 that are coprime to it. Stepping through them skips ~77% of all integers, which are
+# guaranteed to be composite.
+_WHEEL_MODULUS = 210
+_WHEEL = tuple(r for r in range(_WHEEL_MODULUS) if math.gcd(r, _WHEEL_MODULUS) == 1)
+
+
+class _DRBG:
+    """
+    A deterministic random bit generator with fast key erasure, seeded from the OS CSPRNG. Every request expands the
+    current 32-byte key into a new key and the requested output, using AES-256-CTR if cryptography is installed and
+    SHAKE-256 otherwise. It reseeds from the OS after every 1 MiB of output and after a fork.
+    """
+
+    RESEED_INTERVAL = 2 ** 20
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key = b''
+        self._generated = 0
+        self._pid = None
+
+    def _reseed(self) -> None:
+        self._key = secrets.token_bytes(32)
+        self._generated = 0
+        self._pid = os.getpid()
+
+    def read(self, n: int) -> bytes:
+        """
+        Return n random bytes.
+        :param n: The number of bytes to return.
+        :return: n random bytes.
+        """
+        with self._lock:
+            if self._pid != os.getpid() or self._generated >= self.RESEED_INTERVAL:
+                self._reseed()
+            if Cipher is not None:
+                output = Cipher(algorithms.AES(self._key), modes.CTR(bytes(16))).encryptor().update(bytes(32 + n))
+            else:
+                output = hashlib.shake_256(self._key).digest(32 + n)
+            self._key = output[:32]
+            self._generated += n
+            return output[32:]
+
+
+_drbg = _DRBG()
+
+# Requests of at least this many bytes are served by the DRBG, smaller ones directly by the OS.
+_DRBG_THRESHOLD = 4096
+
+
 def random_prime(length: int, miller_rounds: int = 20, max_retries: int = 10000000) -> int:
     """
-    Generate a random prime number.
+    Generate a random prime number. Starting from a random number, candidates coprime to 210 are tested in ascending
+    order; the search restarts from a new random number after 10 * length candidates.
     :param length: The length of the prime in bits.
     :param miller_rounds: The number of Miller-Rabin rounds to perform.
-    :param max_retries: The maximum number of retries.
+    :param max_retries: The maximum number of candidates to test.
     :return: A random prime number within the given constraints.
     """
+    return _search_prime(length, miller_rounds, max_retries, None)
+
+
+def _search_prime(length: int, miller_rounds: int, max_retries: int, stop) -> int | None:
+    """
+    The search of random_prime, which gives up between two candidates once the stop event is set.
+    :param stop: A multiprocessing event, or None.
+    :return: A random prime number, or None if the search was stopped.
+    """
     if length < 4:
         raise ValueError('Length must be at least 4.')
-    for try_ in range(max_retries):
-        p = randint(2 ** (length - 2), 2 ** (length - 1) - 1)
-        p = p * 2 + 1
-        if miller_rabin(p, miller_rounds):
-            return p
+    upper = 2 ** length
+    max_steps = 10 * length
+    tries = 0
+    while tries < max_retries:
+        p = secrets.randbits(length) | (1 << (length - 1)) | 1
+        base, residue = divmod(p, _WHEEL_MODULUS)
+        base *= _WHEEL_MODULUS
+        index = bisect.bisect_left(_WHEEL, residue)
+        for _ in range(min(max_steps, max_retries - tries)):
+            if index == len(_WHEEL):
+                base += _WHEEL_MODULUS
+                index = 0
+            p = base + _WHEEL[index]
+            if p >= upper:
+                break
+            if stop is not None and stop.is_set():
+                return None
+            tries += 1
+            if miller_rabin(p, miller_rounds):
+                return p
+            index += 1
     raise ValueError('Could not find a random prime within the retry limit.')
 
 
+# The stop event of the pool this worker process belongs to, set by _init_worker.
+_worker_stop = None
+
+
+def _init_worker(stop) -> None:
+    global _worker_stop
+    _worker_stop = stop
+
+
+def _random_prime_worker(length: int, miller_rounds: int, max_retries: int) -> int | None:
+    return _search_prime(length, miller_rounds, max_retries, _worker_stop)
+
+
+def random_prime_parallel(
+        length: int, workers: int = None, miller_rounds: int = 20, max_retries: int = 10000000
+) -> int:
+    """
+    Generate a random prime number by running random_prime in several processes and returning the first result.
+    The remaining workers are stopped.
+    :param length: The length of the prime in bits.
+    :param workers: The number of processes. Defaults to the number of CPUs.
+    :param miller_rounds: The number of Miller-Rabin rounds to perform.
+    :param max_retries: The maximum number of candidates to test per process.
+    :return: A random prime number within the given constraints.
+    """
+    return random_primes_parallel(length, 1, workers, miller_rounds, max_retries)[0]
+
+
+def random_primes_parallel(
+        length: int, count: int, workers: int = None, miller_rounds: int = 20, max_retries: int = 10000000
+) -> list[int]:
+    """
+    Generate distinct random prime numbers by running random_prime in several processes. All primes are searched
+    concurrently in one process pool, and each finished worker is restarted until enough primes are found. The running
+    searches are stopped before returning, so none keeps running in the background. With a single worker, the primes are
+    generated in the current process without a pool. Otherwise, scripts calling this function must guard their entry
+    point with if __name__ == '__main__' on platforms that spawn processes (Windows, macOS).
+    :param length: The length of the primes in bits.
+    :param count: The number of distinct primes.
+    :param workers: The number of processes. Defaults to the number of CPUs.
+    :param miller_rounds: The number of Miller-Rabin rounds to perform.
+    :param max_retries: The maximum number of candidates to test per process.
+    :return: A list of count distinct random prime numbers within the given constraints.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    primes = []
+    if workers == 1:
+        while len(primes) < count:
+            prime = random_prime(length, miller_rounds, max_retries)
+            if prime not in primes:
+                primes.append(prime)
+        return primes
+    stop = multiprocessing.Event()
+    executor = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(stop,))
+    try:
+        pending = {
+            executor.submit(_random_prime_worker, length, miller_rounds, max_retries) for _ in range(workers)
+        }
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                prime = future.result()
+                if prime not in primes:
+                    primes.append(prime)
+                    if len(primes) == count:
+                        return primes
+                pending.add(executor.submit(_random_prime_worker, length, miller_rounds, max_retries))
+    finally:
+        stop.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
 def randint(a: int, b: int) -> int:
     """
     Return a random integer N such that a <= N <= b.
@@ -43,16 +206,19 @@ def randint(a: int, b: int) -> int:
 
 def randbytes(n: int) -> bytes:
     """
-    Return n random bytes.
+    Return n random bytes. Large requests are served by a DRBG seeded from the OS, which is considerably faster.
     :param n: The number of bytes to generate.
     :return: n random bytes.
     """
+    if n >= _DRBG_THRESHOLD:
+        return _drbg.read(n)
     return secrets.token_bytes(n)
 
 
 def randfloat(a: float, b: float) -> float:
     """
-    Return a random float N such that a <= N <= b.
+    Return a random float N such that a <= N <= b, computed as a + (b - a) * randfloat01(). N can only equal b due to
+    floating point rounding.
     :param a: The lower bound.
     :param b: The upper bound.
     :return: A random float N such that a <= N <= b.
@@ -60,12 +226,15 @@ def randfloat(a: float, b: float) -> float:
     return a + (b - a) * randfloat01()
 
 
+_2_POW_MINUS_53 = 1.0 / (1 << 53)
+
+
 def randfloat01() -> float:
     """
-    Return a random float N such that 0 <= N <= 1.
-    :return: A random float N such that 0 <= N <= 1.
+    Return a random float N such that 0 <= N < 1, uniformly distributed over all multiples of 2 ** -53.
+    :return: A random float N such that 0 <= N < 1.
     """
-    return int.from_bytes(randbytes(7), 'big', signed=False) / (2 ** 56 - 1)
+    return (int.from_bytes(randbytes(7), 'big') >> 3) * _2_POW_MINUS_53
 
 
 if __name__ == '__main__':
@@ -80,6 +249,50 @@ if __name__ == '__main__':
                 self.assertGreater(n, 2)
                 self.assertLess(n, 2 ** 1024)
 
+        def test_random_prime_small(self):
+            for length in range(4, 16):
+                n = random_prime(length)
+                self.assertTrue(miller_rabin(n))
+                self.assertEqual(n.bit_length(), length)
+
+        def test_random_prime_parallel(self):
+            n = random_prime_parallel(512, workers=2)
+            self.assertTrue(miller_rabin(n))
+            self.assertEqual(n.bit_length(), 512)
+
+        def test_random_primes_parallel(self):
+            for workers in (1, 2):
+                primes = random_primes_parallel(256, 3, workers=workers)
+                self.assertEqual(len(set(primes)), 3)
+                for n in primes:
+                    self.assertTrue(miller_rabin(n))
+                    self.assertEqual(n.bit_length(), 256)
+
+        def test_randbytes(self):
+            for n in (0, 1, 16, 4095, 4096, 4097, 20000):
+                self.assertEqual(len(randbytes(n)), n)
+            self.assertNotEqual(randbytes(32), randbytes(32))
+
+        def test_randbytes_fork(self):
+            if not hasattr(os, 'fork'):
+                self.skipTest('os.fork is not available')
+            randbytes(_DRBG_THRESHOLD)
+            read_fd, write_fd = os.pipe()
+            pid = os.fork()
+            if pid == 0:
+                os.write(write_fd, randbytes(_DRBG_THRESHOLD)[:32])
+                os._exit(0)  # noqa
+            os.waitpid(pid, 0)
+            self.assertNotEqual(os.read(read_fd, 32), randbytes(_DRBG_THRESHOLD)[:32])
+
+        def test_randfloat01(self):
+            for _ in range(256):
+                n = randfloat01()
+                self.assertIsInstance(n, float)
+                self.assertGreaterEqual(n, 0.0)
+                self.assertLess(n, 1.0)
+                self.assertEqual(n * 2 ** 53, int(n * 2 ** 53))
+
         def test_randint(self):
             for _ in range(32):
                 n = randint(0, 100)
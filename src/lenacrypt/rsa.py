@@ -3,52 +3,211 @@ import json
 import warnings
 
 try:
-    from .rand import random_prime, randint
-    from .prime import miller_rabin
+    import gmpy2
 except ImportError:
-    from rand import random_prime, randint
-    from prime import miller_rabin
+    gmpy2 = None
+
+try:
+    from .rand import random_primes_parallel, randint
+    from .prime import miller_rabin, _mont_powmod_kernel
+except ImportError:
+    from rand import random_primes_parallel, randint
+    from prime import miller_rabin, _mont_powmod_kernel
 
 
 __all__ = [
+    'DEFAULT_E',
+    'powmod',
+    'recover_prime_factors',
     'RSAkey',
     'RSApubkey',
 ]
 
 
+DEFAULT_E = 65537
+
+_MONT_MIN_EXP_BITS = 128
+
+
+def _pack_ints(*values: int) -> bytes:
+    """
+    Encode non-negative integers as big-endian bytes, escaping 0x00 as 0x00 0x01 and separating them by 0x00 0xFF.
+
+    :param values: The integers to encode.
+    :return: The encoded bytes.
+    """
+    return b'\x00\xFF'.join([
+        value.to_bytes((value.bit_length() + 7) // 8, 'big').replace(b'\x00', b'\x00\x01') for value in values
+    ])
+
+
+def _unpack_ints(b: bytes, count: int) -> list[int] | None:
+    """
+    Inverse of _pack_ints for a modulus followed by count - 1 smaller integers. The stream is validated before any
+    integer is constructed.
+
+    :param b: The encoded bytes.
+    :param count: The number of encoded integers.
+    :return: The decoded integers, or None if the bytes are malformed.
+    """
+    parts = b.split(b'\x00\xFF', count)
+    if len(parts) != count:
+        return None
+    parts = [part.replace(b'\x00\x01', b'\x00') for part in parts]
+    modulus_length = len(parts[0])
+    for part in parts[1:]:
+        if len(part) > modulus_length:
+            return None
+    return [int.from_bytes(part, 'big') for part in parts]
+
+
+def _dump_json(values: dict, *args, **kwargs) -> str:
+    """
+    Serialize integers to JSON as hexadecimal strings, which unlike decimal convert in linear time and are not
+    subject to the integer string conversion length limit.
+
+    :param values: The integers to serialize by name.
+    :return: The serialized JSON string.
+    """
+    return json.dumps({key: hex(value) for key, value in values.items()}, *args, **kwargs)
+
+
+def _load_json(j: str) -> dict:
+    """
+    Inverse of _dump_json. Plain JSON integers are accepted as well.
+
+    :param j: The JSON string to deserialize from.
+    :return: The deserialized integers by name.
+    """
+    return {key: int(value, 16) if isinstance(value, str) else value for key, value in json.loads(j).items()}
+
+
+def powmod(base: int, exp: int, mod: int) -> int:
+    """
+    Modular exponentiation. Uses GMP's Montgomery/Barrett reduction if gmpy2 is installed, which is several times
+    faster than the builtin pow for RSA-sized moduli. Otherwise, large exponents with an odd modulus use the Numba
+    Montgomery kernel if numba is installed.
+
+    :param base: The base.
+    :param exp: The non-negative exponent.
+    :param mod: The modulus.
+    :return: base ** exp % mod
+    """
+    if gmpy2 is not None:
+        return int(gmpy2.powmod(base, exp, mod))
+    if exp.bit_length() >= _MONT_MIN_EXP_BITS and mod & 1 and mod > 1:
+        mont_powmod = _mont_powmod_kernel()
+        if mont_powmod is not None:
+            return mont_powmod(base, exp, mod)
+    return pow(base, exp, mod)
+
+
+def recover_prime_factors(n: int, e: int, d: int, attempts: int = 100) -> tuple[int, int]:
+    """
+    Recover the prime factors of an RSA modulus from the public and private exponent (NIST SP 800-56B, Appendix C).
+
+    :param n: The modulus.
+    :param e: The public exponent.
+    :param d: The private exponent.
+    :param attempts: The number of random bases to try. Each one succeeds with probability at least 1/2.
+    :return: The prime factors (p, q) with p > q.
+    :raises ValueError: If the key is invalid or the modulus is not the product of two primes.
+    """
+    k = d * e - 1
+    if n < 6 or k <= 0 or k & 1:
+        raise ValueError('Invalid RSA key.')
+    t = (k & -k).bit_length() - 1
+    r = k >> t
+    for _ in range(attempts):
+        y = powmod(randint(2, n - 2), r, n)
+        if y == 1 or y == n - 1:
+            continue
+        for _ in range(t):
+            x = y * y % n
+            if x == 1:
+                p = math.gcd(y - 1, n)
+                q = n // p
+                if p * q != n or not miller_rabin(p) or not miller_rabin(q):
+                    raise ValueError('The modulus is not the product of two primes.')
+                return max(p, q), min(p, q)
+            if x == n - 1:
+                break
+            y = x
+    raise ValueError('Could not recover the prime factors.')
+
+
 class RSAkey:
-    def __init__(self, n: int, e: int, d: int):
+    """
+    An RSA private key. Decryption uses the Chinese remainder theorem with the prime factors p and q,
+    dp = d mod (p - 1), dq = d mod (q - 1) and qinv = q^-1 mod p, which are computed if not given. If only n, e and d
+    are known, p and q are recovered on the first decryption. If n is not the product of two primes, decryption falls
+    back to c^d mod n.
+    """
+
+    __slots__ = ('n', 'e', 'd', 'p', 'q', 'dp', 'dq', 'qinv', '_factors_recovered')
+
+    def __init__(
+            self, n: int, e: int, d: int, p: int = None, q: int = None, dp: int = None, dq: int = None,
+            qinv: int = None
+    ):
         self.n = n
         self.e = e
         self.d = d
+        self.p = p
+        self.q = q
+        self.dp = dp
+        self.dq = dq
+        self.qinv = qinv
+        self._factors_recovered = False
+        if p is not None and q is not None:
+            self._set_crt_parameters(p, q, dp, dq, qinv)
+
+    def _set_crt_parameters(self, p: int, q: int, dp: int = None, dq: int = None, qinv: int = None) -> None:
+        self.p = p
+        self.q = q
+        self.dp = self.d % (p - 1) if dp is None else dp
+        self.dq = self.d % (q - 1) if dq is None else dq
+        self.qinv = pow(q, -1, p) if qinv is None else qinv
+
+    def _recover_crt_parameters(self) -> None:
+        self._factors_recovered = True
+        try:
+            p, q = recover_prime_factors(self.n, self.e, self.d)
+        except ValueError:
+            return
+        self._set_crt_parameters(p, q)
 
     @classmethod
     def generate(
-            cls, length: int = 4096, e: int = None, miller_rounds: int = 32, max_retries: int = 10000000
+            cls, length: int = 4096, e: int = None, miller_rounds: int = 32, max_retries: int = 10000000,
+            workers: int = 2
     ) -> 'RSAkey':
         """
-        Generate a random RSA key.
+        Generate a random RSA key. By default, both primes are searched concurrently in a pool of two processes, which
+        requires scripts to guard their entry point with if __name__ == '__main__' on platforms that spawn processes
+        (Windows, macOS). With workers=1, the primes are searched in the current process. The key keeps the primes for
+        CRT-based decryption.
 
         :param length: The length of the RSA modulus in bits.
-        :param e: The public exponent. If None, a random prime is chosen.
+        :param e: The public exponent. Defaults to 65537.
         :param miller_rounds: The number of Miller-Rabin test rounds for primality testing.
         :param max_retries: The maximum number of retries to find a suitable prime.
+        :param workers: The number of processes searching for the primes. Defaults to 2.
         :return: An instance of RSAkey containing the generated RSA key.
         """
-        p = random_prime(length // 2, miller_rounds, max_retries)
-        q = None
-        while q is None or q == p:
-            q = random_prime(length // 2, miller_rounds, max_retries)
+        default_e = e is None
+        if default_e:
+            e = DEFAULT_E
+        while True:
+            p, q = random_primes_parallel(length // 2, 2, workers, miller_rounds, max_retries)
+            phi = (p - 1) * (q - 1)
+            if math.gcd(e, phi) == 1:
+                break
+            if not default_e:
+                raise ValueError('e must be coprime with phi(n)')
         n = p * q
-        phi = (p - 1) * (q - 1)
-        if e is None:
-            e = random_prime(length // 2, miller_rounds, max_retries)
-            while math.gcd(e, phi) != 1:
-                e = random_prime(length // 2, miller_rounds, max_retries)
-        elif math.gcd(e, phi) != 1:
-            raise ValueError('e must be coprime with phi(n)')
         d = pow(e, -1, phi)
-        return RSAkey(n, e, d)
+        return RSAkey(n, e, d, p, q)
         
     def __str__(self) -> str:
         return f"RSAkey(n={self.n}, e={self.e}, d={self.d})"
@@ -60,23 +219,23 @@ class RSAkey:
         return self.to_bytes()
     
     def __eq__(self, other) -> bool:
-        return self.n == other.n and self.e == other.e and self.d == other.d
+        if other is self:
+            return True
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.e == other.e and self.n == other.n and self.d == other.d
     
     def __ne__(self, other) -> bool:
         return not self == other
     
     def __hash__(self) -> int:
         return hash((self.n, self.e, self.d))
-    
-    def __dict__(self) -> dict:
-        return {
-            'n': self.n,
-            'e': self.e,
-            'd': self.d
-        }
 
+    def __reduce__(self) -> tuple:
+        return type(self), (self.n, self.e, self.d, self.p, self.q, self.dp, self.dq, self.qinv)
+    
     def __len__(self) -> int:
-        return math.ceil(math.log2(self.n))
+        return self.n.bit_length()
 
     @classmethod
     def from_bytes(cls, b: bytes) -> 'RSAkey':
@@ -86,10 +245,8 @@ class RSAkey:
         :param b: The bytes to deserialize from.
         :return: An instance of RSAkey containing the deserialized RSA key.
         """
-        byte_values = b.split(b'\x00\xFF')
-        int_values = [int.from_bytes(v.replace(b'\x00\x01', b'\x00'),
-                                     'big', signed=False) for v in byte_values]
-        if len(int_values) < 3:
+        int_values = _unpack_ints(b, 3)
+        if int_values is None:
             raise ValueError('Invalid RSA key bytes.')
         return RSAkey.from_list(int_values)
 
@@ -99,11 +256,7 @@ class RSAkey:
 
         :return: The serialized bytes.
         """
-        return b'\x00\xFF'.join([
-            self.n.to_bytes((self.n.bit_length() + 7) // 8, 'big', signed=False).replace(b'\x00', b'\x00\x01'),
-            self.e.to_bytes((self.e.bit_length() + 7) // 8, 'big', signed=False).replace(b'\x00', b'\x00\x01'),
-            self.d.to_bytes((self.d.bit_length() + 7) // 8, 'big', signed=False).replace(b'\x00', b'\x00\x01')
-        ])
+        return _pack_ints(self.n, self.e, self.d)
 
     @classmethod
     def from_dict(cls, d: dict) -> 'RSAkey':
@@ -131,7 +284,7 @@ class RSAkey:
         :param j: The JSON string to deserialize from.
         :return: An instance of RSAkey containing the deserialized RSA key.
         """
-        return RSAkey(**json.loads(j))
+        return RSAkey(**_load_json(j))
 
     def to_json(self, *args, **kwargs) -> str:
         """
@@ -139,7 +292,7 @@ class RSAkey:
 
         :return: The serialized JSON string.
         """
-        return json.dumps(self.__dict__(), *args, **kwargs)
+        return _dump_json(self.to_dict(), *args, **kwargs)
 
     @classmethod
     def from_list(cls, l: list[int]) -> 'RSAkey':
@@ -164,10 +317,17 @@ class RSAkey:
     def _encrypt(self, m: int) -> int:
         if m > self.n:
             raise ValueError('Message too large for encryption.')
-        return pow(m, self.e, self.n)
+        return powmod(m, self.e, self.n)
 
     def _decrypt(self, c: int) -> int:
-        return pow(c, self.d, self.n)
+        if self.p is None and not self._factors_recovered:
+            self._recover_crt_parameters()
+        if self.p is None or self.q is None:
+            return powmod(c, self.d, self.n)
+        m1 = powmod(c, self.dp, self.p)
+        m2 = powmod(c, self.dq, self.q)
+        h = self.qinv * (m1 - m2) % self.p
+        return m2 + h * self.q
 
     def simple_int_encrypt(self, m: int, disable_warning: bool = False) -> int:
         """
@@ -190,11 +350,12 @@ class RSAkey:
         """
         return self._decrypt(c)
 
-    def is_probably_valid(self, tests: int = 32, miller_rounds: int = 32, disable_warning: bool = False) -> bool:
+    def is_probably_valid(self, tests: int = 4, miller_rounds: int = 32, disable_warning: bool = False) -> bool:
         """
-        Experimental function to check if an RSA key is probably valid.
+        Experimental function to check if an RSA key is probably valid. If the prime factors are known, e * d must be
+        1 modulo lcm(p - 1, q - 1), which makes the encryption roundtrips a mere sanity check.
 
-        :param tests: The number of tests to run. Defaults to 32.
+        :param tests: The number of encryption roundtrips to run. Defaults to 4.
         :param miller_rounds: The number of Miller-Rabin rounds to perform. Defaults to 32.
         :param disable_warning: Disable the warning message that this function has a high false positive rate. Defaults to False.
         :return: True if the key is probably valid, False otherwise.
@@ -211,6 +372,10 @@ class RSAkey:
             self.n > 2
         ):
             return False
+        if self.p is not None and self.q is not None and (
+            self.p * self.q != self.n or self.e * self.d % math.lcm(self.p - 1, self.q - 1) != 1
+        ):
+            return False
         for i in range(tests):
             m = randint(2, self.n // 2 - 1)
             c = self._encrypt(m)
@@ -220,6 +385,8 @@ class RSAkey:
 
 
 class RSApubkey(RSAkey):
+    __slots__ = ()
+
     def __init__(self, n: int, e: int):
         super().__init__(n, e, 0)
 
@@ -248,7 +415,11 @@ class RSApubkey(RSAkey):
         return self.to_bytes()
 
     def __eq__(self, other) -> bool:
-        return self.n == other.n and self.e == other.e
+        if other is self:
+            return True
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.e == other.e and self.n == other.n
 
     def __ne__(self, other) -> bool:
         return not self == other
@@ -256,6 +427,9 @@ class RSApubkey(RSAkey):
     def __hash__(self) -> int:
         return hash((self.n, self.e))
 
+    def __reduce__(self) -> tuple:
+        return type(self), (self.n, self.e)
+
     @classmethod
     def from_bytes(cls, b: bytes) -> 'RSApubkey':
         """
@@ -264,10 +438,8 @@ class RSApubkey(RSAkey):
         :param b: The bytes to deserialize from.
         :return: An instance of RSAkey containing the deserialized RSA key.
         """
-        byte_values = b.split(b'\x00\xFF')
-        int_values = [int.from_bytes(v.replace(b'\x00\x01', b'\x00'),
-                                     'big', signed=False) for v in byte_values]
-        if len(int_values) < 2:
+        int_values = _unpack_ints(b, 2)
+        if int_values is None:
             raise ValueError('Invalid RSA public key bytes.')
         return RSApubkey.from_list(int_values)
 
@@ -277,10 +449,7 @@ class RSApubkey(RSAkey):
 
         :return: The serialized bytes.
         """
-        return b'\x00\xFF'.join([
-            self.n.to_bytes((self.n.bit_length() + 7) // 8, 'big', signed=False).replace(b'\x00', b'\x00\x01'),
-            self.e.to_bytes((self.e.bit_length() + 7) // 8, 'big', signed=False).replace(b'\x00', b'\x00\x01'),
-        ])
+        return _pack_ints(self.n, self.e)
 
     @classmethod
     def from_dict(cls, d: dict) -> 'RSApubkey':
@@ -308,7 +477,7 @@ class RSApubkey(RSAkey):
         :param j: The JSON string to deserialize from.
         :return: An instance of RSAkey containing the deserialized RSA key.
         """
-        return cls(**json.loads(j))
+        return cls(**_load_json(j))
 
     def to_json(self, *args, **kwargs) -> str:
         """
@@ -316,7 +485,7 @@ class RSApubkey(RSAkey):
 
         :return: The serialized JSON string.
         """
-        return json.dumps(self.__dict__(), *args, **kwargs)
+        return _dump_json(self.to_dict(), *args, **kwargs)
 
     @classmethod
     def from_list(cls, l: list[int]) -> 'RSApubkey':
@@ -379,6 +548,59 @@ if __name__ == '__main__':
             for _ in range(4):
                 key = RSAkey.generate()
                 self.assertTrue(key.is_probably_valid())
+            key = RSAkey.generate(1024, workers=1)
+            self.assertEqual(key.p * key.q, key.n)
+
+        def test_powmod(self):
+            for length in (64, 256, 1024):
+                mod = randint(2 ** (length - 1), 2 ** length - 1)
+                base = randint(0, 2 ** (length + 8))
+                for exp in (0, 1, 65537, randint(2 ** 127, 2 ** 1024)):
+                    self.assertEqual(powmod(base, exp, mod), pow(base, exp, mod))
+
+        def test_rsa_len(self):
+            self.assertEqual(len(RSAkey(2 ** 64 + 1, 3, 5)), 65)
+            self.assertEqual(len(RSAkey(2 ** 64 - 1, 3, 5)), 64)
+
+        def test_rsa_eq(self):
+            key = RSAkey(3233, 17, 413)
+            self.assertEqual(key, RSAkey(3233, 17, 413))
+            self.assertNotEqual(key, RSAkey(3233, 17, 2753))
+            self.assertNotEqual(key, None)
+            self.assertNotEqual(RSApubkey(3233, 17), RSAkey(3233, 17, 0))
+
+        def test_rsa_bytes(self):
+            key = RSAkey(3233, 17, 413)
+            self.assertEqual(RSAkey.from_bytes(key.to_bytes()), key)
+            self.assertEqual(RSApubkey.from_bytes(RSApubkey(3233, 17).to_bytes()), RSApubkey(3233, 17))
+            malformed = [
+                b'', RSApubkey(3233, 17).to_bytes(), key.to_bytes() + b'\x00\xFF\x01', RSAkey(17, 3233, 1).to_bytes()
+            ]
+            for b in malformed:
+                with self.assertRaises(ValueError):
+                    RSAkey.from_bytes(b)
+
+        def test_rsa_pickle(self):
+            import pickle
+            key = RSAkey(3233, 17, 413, 61, 53)
+            unpickled = pickle.loads(pickle.dumps(key))
+            self.assertEqual(unpickled, key)
+            self.assertEqual((unpickled.p, unpickled.q, unpickled.qinv), (61, 53, key.qinv))
+            pubkey = RSApubkey(3233, 17)
+            self.assertEqual(pickle.loads(pickle.dumps(pubkey)), pubkey)
+
+        def test_rsa_json(self):
+            key = RSAkey(3233, 17, 413)
+            self.assertEqual(RSAkey.from_json(key.to_json()), key)
+            pubkey = RSApubkey(3233, 17)
+            self.assertEqual(RSApubkey.from_json(pubkey.to_json()), pubkey)
+            self.assertEqual(RSAkey.from_json('{"e": 17, "d": 413, "n": 3233}'), key)
+            key = RSAkey(2 ** 16384 + 1, 3, 5)
+            self.assertEqual(RSAkey.from_json(key.to_json()), key)
+
+        def test_rsa_is_probably_valid(self):
+            self.assertTrue(RSAkey(3233, 17, 413, 61, 53).is_probably_valid(disable_warning=True))
+            self.assertFalse(RSAkey(3233, 17, 415, 61, 53).is_probably_valid(tests=0, disable_warning=True))
 
         def test_rsa_encrypt_decrypt(self):
             for _ in range(4):
@@ -388,4 +610,31 @@ if __name__ == '__main__':
                 decrypted = key._decrypt(encrypted)
                 self.assertEqual(message, decrypted)
 
+        def test_rsa_crt_decrypt(self):
+            key = RSAkey.generate(1024)
+            for _ in range(4):
+                c = randint(2, key.n - 1)
+                self.assertEqual(key._decrypt(c), pow(c, key.d, key.n))
+
+        def test_rsa_recover_prime_factors(self):
+            key = RSAkey.generate(1024)
+            self.assertEqual(recover_prime_factors(key.n, key.e, key.d), (max(key.p, key.q), min(key.p, key.q)))
+            plain_key = RSAkey(key.n, key.e, key.d)
+            c = randint(2, key.n - 1)
+            self.assertEqual(plain_key._decrypt(c), key._decrypt(c))
+            self.assertIsNotNone(plain_key.p)
+
+        def test_rsa_multi_prime_decrypt(self):
+            n = 1009 * 1013 * 1019
+            e = 17
+            d = pow(e, -1, math.lcm(1008, 1012, 1018))
+            key = RSAkey(n, e, d)
+            with self.assertRaises(ValueError):
+                recover_prime_factors(n, e, d)
+            for _ in range(20):
+                c = randint(2, n - 1)
+                self.assertEqual(key._decrypt(c), pow(c, d, n))
+            self.assertIsNone(key.p)
+            self.assertTrue(key.is_probably_valid(disable_warning=True))
+
     unittest.main()
@@ -1,3 +1,5 @@
+import functools
+import struct
 import typing as t
 from rsa import RSAkey, RSApubkey
 from aes import AES, AesExt
@@ -6,129 +8,439 @@ from aes import AES, AesExt
 __all__ = [
     'serialize',
     'deserialize',
+    'iter_serialize',
+    'is_supported_type',
     'SUPPORTED_TYPES',
+    'SUPPORTED_TYPE_NAMES',
+    'MAX_NESTING_DEPTH',
 ]
 
 
-SUPPORTED_TYPES = [
-    str, bytes, int, bool, float, list, None, tuple, dict
-]
+MAX_NESTING_DEPTH = 10000
+
+
+SUPPORTED_TYPES = frozenset({
+    str, bytes, int, bool, float, list, type(None), tuple, dict, RSApubkey, RSAkey, AES, AesExt
+})
+
+SUPPORTED_TYPE_NAMES = frozenset({
+    'str', 'bytes', 'int', 'bool', 'float', 'float64', 'list', 'None', 'tuple', 'dict', 'RSApubkey', 'RSAkey', 'AES',
+    'AesExt'
+})
+
+
+_pack_float64 = struct.Struct('>d').pack
+
+_unpack_float64 = struct.Struct('>d').unpack
+
+
+def _pack_varint(n: int, out: bytearray) -> None:
+    """
+    Append a non-negative integer to a buffer as an unsigned LEB128 varint.
+    :param n: The integer to append.
+    :param out: The buffer to append to.
+    """
+    while n > 0x7F:
+        out.append(n & 0x7F | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _unpack_varint(b: bytes, i: int) -> tuple[int, int]:
+    """
+    Read an unsigned LEB128 varint.
+    :param b: The bytes to read from.
+    :param i: The position of the varint.
+    :return: The integer and the position after the varint.
+    """
+    n = 0
+    shift = 0
+    while True:
+        if i >= len(b):
+            raise ValueError('Truncated varint.')
+        byte = b[i]
+        i += 1
+        n |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return n, i
+        shift += 7
+
+
+class _Options(t.NamedTuple):
+    encoding: str = 'utf-8'
+    byte_order: str = 'big'
+    float_format: str = 'binary'
+
+
+_DEFAULT_OPTIONS = _Options()
+
+
+def _serialize_str(obj: str, options: _Options) -> tuple[bytes, bytes]:
+    encoding = options.encoding
+    return f'str:{encoding}\x00'.encode(), obj.encode(encoding)
+
+
+def _serialize_bytes(obj: bytes, options: _Options) -> tuple[bytes, bytes]:
+    return b'bytes\x00', obj
+
+
+def _serialize_int(obj: int, options: _Options) -> tuple[bytes, bytes]:
+    byte_order = options.byte_order
+    return f'int:{byte_order}\x00'.encode(), obj.to_bytes((obj.bit_length() + 7) // 8, byte_order)
+
+
+def _serialize_bool(obj: bool, options: _Options) -> tuple[bytes, bytes]:
+    return b'bool\x00', b'\x01' if obj else b'\x00'
+
+
+def _serialize_float(obj: float, options: _Options) -> tuple[bytes, bytes]:
+    if options.float_format == 'decimal':
+        return b'float\x00', str(obj).encode('utf-8')
+    return b'float64\x00', _pack_float64(obj)
+
+
+def _append_framed(buffer: bytearray, child: bytes) -> None:
+    size = len(child)
+    if size < 0x80:
+        buffer.append(size)
+    else:
+        _pack_varint(size, buffer)
+    buffer += child
 
 
-def serialize(obj: t.Any, value_only: bool = False, **kwargs) -> bytes:
+def _serialize_list_body(items: t.Iterable) -> bytes:
     """
-    Serialize an object to bytes. SUPPORTED_TYPES contains the full list of supported types.
+    Serialize the elements of a list, tuple or dict. Nested lists, tuples and dicts are walked with an explicit stack
+    instead of recursion, so the nesting depth is not limited by the recursion limit.
+    :param items: The elements to serialize.
+    :return: The serialized body without the type tag.
+    """
+    root = bytearray()
+    stack = [(iter(items), root, b'')]
+    while stack:
+        iterator, buffer, header = stack[-1]
+        for o in iterator:
+            child_header = _CONTAINER_HEADERS.get(type(o))
+            if child_header is not None:
+                stack.append((iter(o.items() if type(o) is dict else o), bytearray(), child_header))
+                break
+            _append_framed(buffer, serialize(o))
+        else:
+            stack.pop()
+            if stack:
+                _append_framed(stack[-1][1], header + buffer)
+    return bytes(root)
+
+
+def _serialize_list(obj: list, options: _Options) -> tuple[bytes, bytes]:
+    return b'list\x00', _serialize_list_body(obj)
+
+
+def _serialize_none(obj: None, options: _Options) -> tuple[bytes, bytes]:
+    return b'None\x00', b''
+
+
+def _serialize_tuple(obj: tuple, options: _Options) -> tuple[bytes, bytes]:
+    return b'tuple\x00', _serialize_list_body(obj)
+
+
+def _serialize_dict(obj: dict, options: _Options) -> tuple[bytes, bytes]:
+    return b'dict\x00', _serialize_list_body(obj.items())
+
+
+def _serialize_rsa_pubkey(obj: RSApubkey, options: _Options) -> tuple[bytes, bytes]:
+    return b'RSApubkey\x00', obj.to_bytes()
+
+
+def _serialize_rsa_key(obj: RSAkey, options: _Options) -> tuple[bytes, bytes]:
+    return b'RSAkey\x00', obj.to_bytes()
+
+
+def _serialize_aes_ext(obj: AesExt, options: _Options) -> tuple[bytes, bytes]:
+    return b'AesExt\x00', obj.key
+
+
+def _serialize_aes(obj: AES, options: _Options) -> tuple[bytes, bytes]:
+    return b'AES\x00', obj.key
+
+
+_SERIALIZERS = {
+    str: _serialize_str,
+    bytes: _serialize_bytes,
+    bool: _serialize_bool,
+    int: _serialize_int,
+    float: _serialize_float,
+    list: _serialize_list,
+    type(None): _serialize_none,
+    tuple: _serialize_tuple,
+    dict: _serialize_dict,
+    RSApubkey: _serialize_rsa_pubkey,
+    RSAkey: _serialize_rsa_key,
+    AesExt: _serialize_aes_ext,
+    AES: _serialize_aes,
+}
+
+
+_CONTAINER_HEADERS = {
+    list: b'list\x00',
+    tuple: b'tuple\x00',
+    dict: b'dict\x00',
+}
+
+_STR_UTF8_HEADER = b'str:utf-8\x00'
+
+_INT_BIG_HEADER = b'int:big\x00'
+
+_BOOL_TRUE = b'bool\x00\x01'
+
+_BOOL_FALSE = b'bool\x00\x00'
+
+_SMALL_INTS = tuple(_INT_BIG_HEADER + i.to_bytes((i.bit_length() + 7) // 8, 'big') for i in range(256))
+
+
+def is_supported_type(obj: t.Any) -> bool:
+    """
+    Check whether the exact type of an object is in SUPPORTED_TYPES. Subclasses of supported types are still accepted by
+    serialize, but are not reported here.
+    :param obj: The object to check.
+    :return: True if type(obj) is supported.
+    """
+    return type(obj) in SUPPORTED_TYPES
+
+
+def _find_serializer(cls: type) -> t.Optional[t.Callable[[t.Any, _Options], tuple[bytes, bytes]]]:
+    """
+    Find the serializer for a subclass of a supported type by walking its MRO, and cache it for the next call.
+    :param cls: The type of the object to serialize.
+    :return: The serializer, or None if the type is not supported.
+    """
+    for base in cls.__mro__[1:]:
+        serializer = _SERIALIZERS.get(base)
+        if serializer is not None:
+            _SERIALIZERS[cls] = serializer
+            return serializer
+    return None
+
+
+def serialize(
+        obj: t.Any, value_only: bool = False, encoding: str = None, byte_order: str = None, float_format: str = None
+) -> bytes:
+    """
+    Serialize an object to bytes. SUPPORTED_TYPES contains the supported types.
     :param obj: The object to serialize.
     :param value_only: If True, only the value is returned (without the type).
-    :param kwargs: Additional keyword arguments.
+    :param encoding: The encoding of a str. Defaults to 'utf-8'.
+    :param byte_order: The byte order of an int, 'big' or 'little'. Defaults to 'big'.
+    :param float_format: 'binary' for IEEE-754 doubles or 'decimal' for the decimal text format of earlier versions.
+    Defaults to 'binary'.
     :return: The serialized bytes.
     """
-    type_: str
-    value: bytes
-    if isinstance(obj, str):
-        encoding = 'utf-8'
-        if 'encoding' in kwargs:
-            encoding = kwargs['encoding']
-        type_ = 'str:' + encoding
-        value = obj.encode(encoding)
-    elif isinstance(obj, bytes):
-        type_ = 'bytes'
-        value = obj
-    elif isinstance(obj, int):
-        byte_order = 'big'
-        if 'byte_order' in kwargs:
-            byte_order = kwargs['byte_order']
-        value = obj.to_bytes((obj.bit_length() + 7) // 8, byte_order)
-        type_ = 'int:' + byte_order
-    elif isinstance(obj, bool):
-        type_ = 'bool'
-        if obj:
-            value = b'\x01'
-        else:
-            value = b'\x00'
-    elif isinstance(obj, float):
-        type_ = 'float'
-        value = str(obj).encode('utf-8')
-    elif isinstance(obj, list):
-        type_ = 'list'
-        value = b'\x00\xFF'.join([serialize(o).replace(b'\x00', b'\x00\x01') for o in obj])
-    elif obj is None:
-        type_ = 'None'
-        value = b''
-    elif isinstance(obj, tuple):
-        type_ = 'tuple'
-        value = serialize(list(obj)).split(b'\x00', 1)[1]
-    elif isinstance(obj, dict):
-        type_ = 'dict'
-        value = serialize(list(obj.items())).split(b'\x00', 1)[1]
-    elif isinstance(obj, RSApubkey):
-        type_ = 'RSApubkey'
-        value = obj.to_bytes()
-    elif isinstance(obj, RSAkey):
-        type_ = 'RSAkey'
-        value = obj.to_bytes()
-    elif isinstance(obj, AesExt):
-        type_ = 'AesExt'
-        value = obj.key
-    elif isinstance(obj, AES):
-        type_ = 'AES'
-        value = obj.key
-    elif value_only:
-        return repr(obj).encode('utf-8')
-    else:
+    if type(obj) is str and encoding is None:
+        value = obj.encode()
+        if value_only:
+            return value
+        return _STR_UTF8_HEADER + value
+    if type(obj) is int and byte_order is None and obj >= 0:
+        if obj < 256 and not value_only:
+            return _SMALL_INTS[obj]
+        value = obj.to_bytes((obj.bit_length() + 7) // 8, 'big')
+        if value_only:
+            return value
+        return _INT_BIG_HEADER + value
+    if type(obj) is bool and not value_only:
+        return _BOOL_TRUE if obj else _BOOL_FALSE
+    serializer = _SERIALIZERS.get(type(obj)) or _find_serializer(type(obj))
+    if serializer is None:
+        if value_only:
+            return repr(obj).encode('utf-8')
         raise NotImplementedError(f'Unsupported type: {type(obj)}')
+    if encoding is None and byte_order is None and float_format is None:
+        options = _DEFAULT_OPTIONS
+    else:
+        if float_format not in (None, 'binary', 'decimal'):
+            raise ValueError(f'Unsupported float format: {float_format}')
+        options = _Options(encoding or 'utf-8', byte_order or 'big', float_format or 'binary')
+    header, value = serializer(obj, options)
     if value_only:
         return value
-    return type_.encode('utf-8') + b'\x00' + value
+    return header + value
+
+
+def iter_serialize(obj: t.Any) -> t.Iterator[bytes]:
+    """
+    Serialize an object in chunks whose concatenation equals serialize(obj). The elements of a top-level list, tuple
+    or dict are serialized one at a time, so consumers like hashes never hold the whole serialization in memory.
+    :param obj: The object to serialize.
+    :return: An iterator over the chunks.
+    """
+    header = _CONTAINER_HEADERS.get(type(obj))
+    if header is None:
+        yield serialize(obj)
+        return
+    yield header
+    size_buffer = bytearray()
+    for o in obj.items() if type(obj) is dict else obj:
+        child = serialize(o)
+        size_buffer.clear()
+        _pack_varint(len(child), size_buffer)
+        yield bytes(size_buffer)
+        yield child
+
+
+def _deserialize_str(value: bytes, encoding: str) -> str:
+    return value.decode(encoding)
+
+
+def _deserialize_int(value: bytes, byte_order: str) -> int:
+    if byte_order not in ('big', 'little'):
+        raise ValueError(f'Unsupported byte order: {byte_order}')
+    return int.from_bytes(value, byte_order)  # noqa
+
+
+def _deserialize_utf8(value: bytes) -> str:
+    return value.decode()
+
+
+def _deserialize_int_big(value: bytes) -> int:
+    return int.from_bytes(value, 'big')
+
+
+def _deserialize_bytes(value: bytes) -> bytes:
+    return value
+
+
+def _deserialize_bool(value: bytes) -> bool:
+    return value != b'\x00'
+
+
+def _deserialize_float(value: bytes) -> float:
+    return float(value.decode('utf-8'))
+
+
+def _deserialize_float64(value: bytes) -> float:
+    return _unpack_float64(value)[0]
+
+
+def _deserialize_list(value: bytes) -> list:
+    """
+    Deserialize the body of a list, tuple or dict. Nested lists, tuples and dicts are walked with an explicit stack of
+    absolute offsets into the body, so no level copies the rest of the payload. The nesting depth is limited to
+    MAX_NESTING_DEPTH.
+    :param value: The serialized body without the type tag.
+    :return: The elements.
+    """
+    root = []
+    stack = [(len(value), root, None)]
+    i = 0
+    while stack:
+        stop, result, container = stack[-1]
+        while i < stop:
+            size = value[i]
+            if size < 0x80:
+                i += 1
+            else:
+                size, i = _unpack_varint(value, i)
+            end = i + size
+            if end > stop:
+                raise ValueError('Truncated list element.')
+            if size and value[i] in _CONTAINER_INITIALS:
+                separator = value.find(b'\x00', i, end)
+                child_container = _CONTAINER_TYPES.get(value[i:separator]) if separator >= 0 else None
+                if child_container is not None:
+                    if len(stack) > MAX_NESTING_DEPTH:
+                        raise ValueError('Maximum nesting depth exceeded.')
+                    stack.append((end, [], child_container))
+                    i = separator + 1
+                    break
+            head, separator, body = value[i:end].partition(b'\x00')
+            if not separator:
+                raise ValueError('Missing type tag.')
+            result.append(_deserialize_tagged(head, body))
+            i = end
+        else:
+            stack.pop()
+            if stack:
+                stack[-1][1].append(result if container is list else container(result))
+    return root
+
+
+def _deserialize_none(value: bytes) -> None:
+    return None
+
+
+def _deserialize_tuple(value: bytes) -> tuple:
+    return tuple(_deserialize_list(value))
+
+
+def _deserialize_dict(value: bytes) -> dict:
+    return dict(_deserialize_list(value))
+
+
+_CONTAINER_TYPES = {
+    b'list': list,
+    b'tuple': tuple,
+    b'dict': dict,
+}
+
+_CONTAINER_INITIALS = frozenset(head[0] for head in _CONTAINER_TYPES)
+
+_DESERIALIZERS = {
+    b'bytes': _deserialize_bytes,
+    b'str:utf-8': _deserialize_utf8,
+    b'int:big': _deserialize_int_big,
+    b'bool': _deserialize_bool,
+    b'float': _deserialize_float,
+    b'float64': _deserialize_float64,
+    b'list': _deserialize_list,
+    b'None': _deserialize_none,
+    b'tuple': _deserialize_tuple,
+    b'dict': _deserialize_dict,
+    b'RSApubkey': RSApubkey.from_bytes,
+    b'RSAkey': RSAkey.from_bytes,
+    b'AesExt': AesExt,
+    b'AES': AES,
+}
+
+_PARAMETRIC_DESERIALIZERS = {
+    'str': _deserialize_str,
+    'int': _deserialize_int,
+}
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_parametric_tag(head: bytes) -> tuple[t.Callable[[bytes, str], t.Any], str]:
+    """
+    Split a parametric type tag such as b'str:latin-1' into its deserializer and parameter, and cache the result.
+    :param head: The type tag.
+    :return: The deserializer and the parameter.
+    """
+    type_ = head.decode()
+    name, separator, parameter = type_.partition(':')
+    deserializer = _PARAMETRIC_DESERIALIZERS.get(name) if separator else None
+    if deserializer is None:
+        raise NotImplementedError(f'Unsupported type: {type_}')
+    return deserializer, parameter
+
+
+def _deserialize_tagged(head: bytes, value: bytes) -> t.Any:
+    deserializer = _DESERIALIZERS.get(head)
+    if deserializer is not None:
+        return deserializer(value)
+    deserializer, parameter = _parse_parametric_tag(head)
+    return deserializer(value, parameter)
 
 
 def deserialize(b: bytes) -> t.Any:
     """
-    Deserialize bytes to an object. SUPPORTED_TYPES contains the full list of supported types.
-    :param b: The bytes to deserialize.
+    Deserialize bytes to an object. SUPPORTED_TYPE_NAMES contains the supported type tags.
+    :param b: The bytes to deserialize. Other bytes-like objects such as bytearray or memoryview are copied to bytes.
     :return: The deserialized object.
     """
-    type_end = b.index(b'\x00')
-    type_ = b[:type_end].decode('utf-8')
-    value = b[type_end + 1:]
-    if type_.startswith('str:'):
-        encoding = type_.split(':')[1]
-        return value.decode(encoding)
-    elif type_ == 'bytes':
-        return value
-    elif type_.startswith('int:'):
-        byte_order = type_.split(':')[1]
-        if byte_order not in ('big', 'little'):
-            raise ValueError(f'Unsupported byte order: {byte_order}')
-        return int.from_bytes(value, byte_order)  # noqa
-    elif type_ == 'bool':
-        return value != b'\x00'
-    elif type_ == 'float':
-        return float(value.decode('utf-8'))
-    elif type_ == 'list':
-        if not value:
-            return []
-        return [deserialize(part.replace(b'\x00\x01', b'\x00')) for part in value.split(b'\x00\xFF')]
-    elif type_ == 'None':
-        return None
-    elif type_ == 'tuple':
-        if not value:
-            return tuple()
-        return tuple(deserialize(b'list\x00' + value))
-    elif type_ == 'dict':
-        if not value:
-            return dict()
-        return dict(deserialize(b'list\x00' + value))
-    elif type_ == 'RSApubkey':
-        return RSApubkey.from_bytes(value)
-    elif type_ == 'RSAkey':
-        return RSAkey.from_bytes(value)
-    elif type_ == 'AesExt':
-        return AesExt(value)
-    elif type_ == 'AES':
-        return AES(value)
-    else:
-        raise NotImplementedError(f'Unsupported type: {type_}')
+    b = bytes(b)
+    head, separator, value = b.partition(b'\x00')
+    if not separator:
+        raise ValueError('Missing type tag.')
+    return _deserialize_tagged(head, value)
 
 
 if __name__ == '__main__':
@@ -154,6 +466,7 @@ if __name__ == '__main__':
                     serialized = serialize(obj)
                     deserialized = deserialize(serialized)
                     self.assertEqual(obj, deserialized)
+                    self.assertIs(type(obj), type(deserialized))
 
         def test_list_serialization(self):
             test_lists = [
@@ -206,10 +519,61 @@ if __name__ == '__main__':
                     deserialized = deserialize(serialized)
                     self.assertEqual(dct, deserialized)
 
+        def test_float_formats(self):
+            for obj in (0.1, -0.0, 1e308, float('inf')):
+                with self.subTest(obj=obj):
+                    self.assertEqual(len(serialize(obj, value_only=True)), 8)
+                    self.assertEqual(repr(obj), repr(deserialize(serialize(obj))))
+                    self.assertEqual(repr(obj), repr(deserialize(serialize(obj, float_format='decimal'))))
+            self.assertEqual(deserialize(b'float\x003.14159'), 3.14159)
+            with self.assertRaises(ValueError):
+                serialize(1.5, float_format='bogus')
+
+        def test_list_framing(self):
+            for lst in ([b'\x00' * 200, b'x' * 20000], [[[[b'\x00\xFF\x00\x01']]]]):
+                with self.subTest(lst=lst):
+                    self.assertEqual(lst, deserialize(serialize(lst)))
+            with self.assertRaises(ValueError):
+                deserialize(serialize([b'x' * 200])[:-1])
+            for malformed in (b'list\x00\x80', b'list\x00\x05listX'):
+                with self.assertRaisesRegex(ValueError, 'Truncated|Missing'):
+                    deserialize(malformed)
+
+        def test_bytes_like(self):
+            for obj in (1, 'abc', [1, ('a', b'x')], AES(b'1' * 32)):
+                serialized = serialize(obj)
+                self.assertEqual(deserialize(bytearray(serialized)), obj)
+                self.assertEqual(deserialize(memoryview(serialized)), obj)
+
+        def test_deep_nesting(self):
+            deep = []
+            inner = deep
+            for _ in range(5000):
+                inner.append([])
+                inner = inner[0]
+            inner.append((1, {'a': b'x'}))
+            deserialized = deserialize(serialize(deep))
+            for _ in range(5000):
+                self.assertEqual(len(deserialized), 1)
+                deserialized = deserialized[0]
+            self.assertEqual(deserialized, [(1, {'a': b'x'})])
+            too_deep = []
+            for _ in range(MAX_NESTING_DEPTH + 1):
+                too_deep = [too_deep]
+            with self.assertRaises(ValueError):
+                deserialize(serialize(too_deep))
+
+        def test_supported_types(self):
+            for obj in ['a', b'a', 1, True, 1.5, [], None, (), {}, AES(b'1' * 32)]:
+                self.assertTrue(is_supported_type(obj))
+                self.assertIn(serialize(obj).partition(b'\x00')[0].decode().partition(':')[0], SUPPORTED_TYPE_NAMES)
+            self.assertFalse(is_supported_type(object()))
+            self.assertNotIn(None, SUPPORTED_TYPES)
+
         def test_rsa_serialization(self):
             test_rsa = [
-                RSApubkey.from_list([123, 456]),
-                RSAkey.from_list([123, 456, 789]),
+                RSApubkey.from_list([3233, 17]),
+                RSAkey.from_list([3233, 17, 413]),
             ]
             for rsa in test_rsa:
                 with self.subTest(rsa=rsa):
@@ -1,49 +1,105 @@
+import functools
 import typing as t
-from serialize import serialize
+from serialize import serialize, iter_serialize
 from hashlib import sha3_256 as _sha3_256, sha3_384 as _sha3_384, sha3_512 as _sha3_512
 
 
-def sha3_256(data: t.Any) -> bytes:
-    if not isinstance(data, bytes):
-        data = serialize(data)
-    return _sha3_256(data).digest()
+_ALGORITHMS = (_sha3_256, _sha3_384, _sha3_512)
 
 
-def sha3_384(data: t.Any) -> bytes:
-    if not isinstance(data, bytes):
-        data = serialize(data)
-    return _sha3_384(data).digest()
+@functools.lru_cache(maxsize=1024)
+def _cached_digest(algorithm: int, data: bytes) -> bytes:
+    return _ALGORITHMS[algorithm](data).digest()
 
 
-def sha3_512(data: t.Any) -> bytes:
-    if not isinstance(data, bytes):
-        data = serialize(data)
-    return _sha3_512(data).digest()
+def _digest(algorithm: int, data: t.Any, cache: bool) -> bytes:
+    if isinstance(data, bytes):
+        if cache:
+            return _cached_digest(algorithm, bytes(data))
+        return _ALGORITHMS[algorithm](data).digest()
+    if cache:
+        return _cached_digest(algorithm, serialize(data))
+    hash_ = _ALGORITHMS[algorithm]()
+    for chunk in iter_serialize(data):
+        hash_.update(chunk)
+    return hash_.digest()
+
+
+def sha3_256(data: t.Any, cache: bool = False) -> bytes:
+    """
+    SHA3-256 of bytes or of the serialized object.
+    :param data: The data to hash.
+    :param cache: Memoize the digest in a bounded LRU cache keyed on the bytes, or on the serialized object. Repeated
+    hashing of the same bytes skips the hash computation, but objects are still serialized on every call. The cache
+    keeps its inputs alive and hits are faster than misses, so do not use it for secrets.
+    :return: The digest.
+    """
+    return _digest(0, data, cache)
+
+
+def sha3_384(data: t.Any, cache: bool = False) -> bytes:
+    """
+    SHA3-384 of bytes or of the serialized object.
+    :param data: The data to hash.
+    :param cache: Memoize the digest, see sha3_256.
+    :return: The digest.
+    """
+    return _digest(1, data, cache)
+
+
+def sha3_512(data: t.Any, cache: bool = False) -> bytes:
+    """
+    SHA3-512 of bytes or of the serialized object.
+    :param data: The data to hash.
+    :param cache: Memoize the digest, see sha3_256.
+    :return: The digest.
+    """
+    return _digest(2, data, cache)
 
 
 if __name__ == '__main__':
-    pass
-    # import unittest
-    # import hashlib
-    # from rand import randbytes, randint
-
-    # class TestSHA3(unittest.TestCase):
-    #     def test_sha3_256(self):
-    #         for i in range(16):
-    #             data = randbytes(randint(0, 1024))
-    #             with self.subTest(data=data):
-    #                 self.assertEqual(hashlib.sha3_256(data).digest(), sha3_256(data))
-
-    #     def test_sha3_512(self):
-    #         for i in range(16):
-    #             data = randbytes(randint(0, 1024))
-    #             with self.subTest(data=data):
-    #                 self.assertEqual(hashlib.sha3_512(data).digest(), sha3_512(data))
-
-    #     def test_sha3_384(self):
-    #         for i in range(16):
-    #             data = randbytes(randint(0, 1024))
-    #             with self.subTest(data=data):
-    #                 self.assertEqual(hashlib.sha3_384(data).digest(), sha3_384(data))
-
-    # unittest.main()
+    import unittest
+    import hashlib
+    from rand import randbytes, randint
+
+    class TestSHA3(unittest.TestCase):
+        def test_sha3_256(self):
+            for i in range(16):
+                data = randbytes(randint(0, 1024))
+                with self.subTest(data=data):
+                    self.assertEqual(hashlib.sha3_256(data).digest(), sha3_256(data))
+
+        def test_sha3_512(self):
+            for i in range(16):
+                data = randbytes(randint(0, 1024))
+                with self.subTest(data=data):
+                    self.assertEqual(hashlib.sha3_512(data).digest(), sha3_512(data))
+
+        def test_sha3_384(self):
+            for i in range(16):
+                data = randbytes(randint(0, 1024))
+                with self.subTest(data=data):
+                    self.assertEqual(hashlib.sha3_384(data).digest(), sha3_384(data))
+
+        def test_sha3_cache(self):
+            data = randbytes(randint(0, 1024))
+            for function, reference in ((sha3_256, hashlib.sha3_256), (sha3_384, hashlib.sha3_384),
+                                        (sha3_512, hashlib.sha3_512)):
+                with self.subTest(function=function):
+                    misses = _cached_digest.cache_info().misses
+                    self.assertEqual(function(data, cache=True), reference(data).digest())
+                    self.assertEqual(_cached_digest.cache_info().misses, misses + 1)
+                    hits = _cached_digest.cache_info().hits
+                    self.assertEqual(function(data, cache=True), reference(data).digest())
+                    self.assertEqual(_cached_digest.cache_info().hits, hits + 1)
+
+        def test_sha3_cache_objects(self):
+            for obj in ('abc', 42, [1, 'a', (b'x', None)], {'k': 2.5}):
+                with self.subTest(obj=obj):
+                    expected = hashlib.sha3_256(serialize(obj)).digest()
+                    self.assertEqual(sha3_256(obj), expected)
+                    self.assertEqual(sha3_256(obj, cache=True), expected)
+                    self.assertEqual(sha3_256(obj, cache=True), sha3_256(obj, cache=False))
+                    self.assertEqual(sha3_512(obj, cache=True), sha3_512(obj))
+
+    unittest.main()